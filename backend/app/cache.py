@@ -0,0 +1,257 @@
+"""
+Shared cache used by every worker process.
+
+Pick a backend with CACHE_URL:
+  memory://                  in-process LRU (default, one copy per worker)
+  sqlite:///./cache.db       on-disk cache shared by all workers on one host
+  redis://host:6379/0        any server speaking the Redis protocol
+
+Keys live in namespaces. Bumping a namespace version makes every key written under
+the previous version unreachable, in all workers at once, without waiting for TTLs.
+Values must be JSON serializable.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+class Cache:
+    """Base class: backends implement the raw _get/_set/_delete/_incr primitives."""
+
+    # False when other worker processes can't see this cache's writes and bumps
+    shared = True
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: str, ttl: Optional[float]):
+        raise NotImplementedError
+
+    def _delete(self, key: str):
+        raise NotImplementedError
+
+    def _incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def version(self, namespace: str) -> int:
+        raw = self._get(f"__ns__:{namespace}")
+        return int(raw) if raw else 0
+
+    def bump(self, namespace: str) -> int:
+        """Invalidate every key in the namespace. Returns the new version."""
+        return self._incr(f"__ns__:{namespace}")
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{namespace}:{self.version(namespace)}:{key}"
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        raw = self._get(self._key(namespace, key))
+        return default if raw is None else json.loads(raw)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        self._set(self._key(namespace, key), json.dumps(value), ttl)
+
+    def delete(self, namespace: str, key: str):
+        self._delete(self._key(namespace, key))
+
+class MemoryCache(Cache):
+    """In-process LRU with per-key expiry."""
+
+    shared = False
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        # Counters (namespace versions) live outside the LRU so they are never evicted
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def version(self, namespace):
+        return self._counters.get(f"__ns__:{namespace}", 0)
+
+class SQLiteCache(Cache):
+    """On-disk cache in a WAL-mode SQLite file, safe to share between processes on one host."""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, key):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def _set(self, key, value, ttl):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def _delete(self, key):
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def _incr(self, key):
+        # Increment and read back in one statement so two processes never get the same value
+        row = self._conn().execute(
+            "INSERT INTO cache_entries (key, value, expires_at) VALUES (?, '1', NULL) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1 "
+            "RETURNING CAST(value AS INTEGER)",
+            (key,),
+        ).fetchone()
+        return row[0]
+
+class RedisCache(Cache):
+    """Minimal RESP2 client, one connection per thread, so no redis package is required."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, prefix: str = "jobtracker:", timeout: float = 2.0):
+        self.host, self.port, self.db, self.password = host, port, db, password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._local.sock = sock
+        self._local.reader = sock.makefile("rb")
+        if self.password:
+            self._call("AUTH", self.password)
+        if self.db:
+            self._call("SELECT", str(self.db))
+
+    def _read(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Cache server closed the connection")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)[:-2]
+            return data.decode()
+        if kind == b"*":
+            return [self._read() for _ in range(int(payload))]
+        raise RuntimeError(f"Unexpected reply from cache server: {line!r}")
+
+    def _call(self, *args):
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode() if isinstance(arg, str) else arg
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            self._local.sock.sendall(b"".join(parts))
+            return self._read()
+        except (OSError, ConnectionError):
+            self._local.sock.close()
+            self._local.sock = None
+            raise
+
+    def _get(self, key):
+        return self._call("GET", self.prefix + key)
+
+    def _set(self, key, value, ttl):
+        if ttl:
+            self._call("SET", self.prefix + key, value, "PX", str(int(ttl * 1000)))
+        else:
+            self._call("SET", self.prefix + key, value)
+
+    def _delete(self, key):
+        self._call("DEL", self.prefix + key)
+
+    def _incr(self, key):
+        return self._call("INCR", self.prefix + key)
+
+def cache_from_url(url: str) -> Cache:
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryCache(int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+    if parsed.scheme == "sqlite":
+        return SQLiteCache(url[len("sqlite:///"):])
+    if parsed.scheme == "redis":
+        return RedisCache(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password,
+        )
+    raise ValueError(f"Unsupported CACHE_URL scheme: {parsed.scheme}")
+
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Cache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = cache_from_url(CACHE_URL)
+    return _cache
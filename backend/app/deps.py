@@ -1,8 +1,10 @@
-from fastapi import Depends, HTTPException, status
+import time
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from .database import SessionLocal
 from .utils.security import decode_token
+from .middleware import record_pool_wait
 from . import models
 
 reusable_oauth2 = HTTPBearer()
@@ -10,15 +12,20 @@ reusable_oauth2 = HTTPBearer()
 def get_db():
     db = SessionLocal()
     try:
+        started = time.perf_counter()
+        db.connection()  # check out now so pool wait can feed load shedding
+        record_pool_wait(time.perf_counter() - started)
         yield db
     finally:
         db.close()
 
 def get_current_user(
+    request: Request,
     token: HTTPAuthorizationCredentials = Depends(reusable_oauth2),
     db: Session = Depends(get_db),
 ) -> models.User:
-    subject = decode_token(token.credentials)
+    # AdmissionControlMiddleware has usually decoded the token already
+    subject = getattr(request.state, "token_subject", None) or decode_token(token.credentials)
     if not subject:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
     user = db.query(models.User).filter(models.User.email == subject).first()
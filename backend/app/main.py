@@ -2,12 +2,19 @@ import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .database import Base, engine
-from .routes import auth, applications, emails, ai
+from .middleware import AdmissionControlMiddleware, CompressionMiddleware
+from .routes import auth, applications, emails, ai, analytics, matching, jobs
+from .services.companies import ensure_company_columns
 
 Base.metadata.create_all(bind=engine)
+ensure_company_columns(engine)
 
 app = FastAPI(title="Intelligent Job Application Tracker API", version="0.1.0")
 
+# Added before CORS so rejected requests still carry CORS headers
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +28,9 @@ app.include_router(auth.router, prefix="/api")
 app.include_router(applications.router, prefix="/api")
 app.include_router(emails.router, prefix="/api")
 app.include_router(ai.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
+app.include_router(matching.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
 
 @app.get("/api/health")
 def health():
@@ -0,0 +1,250 @@
+"""
+Admission control: per-user token buckets and global load shedding.
+
+Each request is sorted into a priority class by path. The bearer token is decoded
+once here and its subject is left on request.state for get_current_user. When the
+worker is saturated (too many requests in flight, or DB connections slow to check
+out), expensive classes are shed first and cheap ones last.
+"""
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .utils.security import decode_token
+
+CHEAP, DEFAULT, EXPENSIVE = "cheap", "default", "expensive"
+
+# Path prefixes per priority class; the first match wins
+ROUTE_CLASSES = [
+    ("/api/health", CHEAP),
+    ("/api/auth/me", CHEAP),
+    ("/api/ai/", EXPENSIVE),
+    ("/api/emails/ingest", EXPENSIVE),
+    ("/api/matching/rank", EXPENSIVE),
+]
+
+def _limits_from_env(name: str, default: Tuple[float, float]) -> Tuple[float, float]:
+    """RATE_LIMIT_<CLASS>="<tokens per second>,<burst>"."""
+    raw = os.getenv(f"RATE_LIMIT_{name.upper()}")
+    if not raw:
+        return default
+    try:
+        rate, burst = (float(part) for part in raw.split(","))
+    except ValueError:
+        raise ValueError(f'RATE_LIMIT_{name.upper()} must look like "<tokens per second>,<burst>", got {raw!r}') from None
+    if rate <= 0 or burst < 1:
+        raise ValueError(f"RATE_LIMIT_{name.upper()} needs a rate above 0 and a burst of at least 1, got {raw!r}")
+    return rate, burst
+
+RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    CHEAP: _limits_from_env(CHEAP, (20.0, 40.0)),
+    DEFAULT: _limits_from_env(DEFAULT, (10.0, 30.0)),
+    EXPENSIVE: _limits_from_env(EXPENSIVE, (0.5, 5.0)),
+}
+
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "64"))
+# Fraction of MAX_IN_FLIGHT at which each class starts being shed
+SHED_AT = {EXPENSIVE: 0.5, DEFAULT: 0.85, CHEAP: 1.0}
+DB_POOL_WAIT_SHED_MS = float(os.getenv("DB_POOL_WAIT_SHED_MS", "250"))
+MAX_TRACKED_BUCKETS = 100000
+
+# The average halves every POOL_WAIT_HALF_LIFE seconds without checkouts. Shedding
+# stops requests before they reach get_db, so waiting for new samples to pull the
+# average down would keep the API shedding indefinitely
+POOL_WAIT_HALF_LIFE = float(os.getenv("DB_POOL_WAIT_HALF_LIFE", "2"))
+
+_pool_wait_ms = 0.0
+_pool_wait_at = time.monotonic()
+
+def pool_wait_ms(now: Optional[float] = None) -> float:
+    now = time.monotonic() if now is None else now
+    return _pool_wait_ms * 0.5 ** (max(0.0, now - _pool_wait_at) / POOL_WAIT_HALF_LIFE)
+
+def record_pool_wait(seconds: float):
+    """Fold one connection checkout time into a time-decayed weighted average."""
+    global _pool_wait_ms, _pool_wait_at
+    now = time.monotonic()
+    _pool_wait_ms = 0.8 * pool_wait_ms(now) + 0.2 * seconds * 1000
+    _pool_wait_at = now
+
+def classify(path: str) -> str:
+    for prefix, cls in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return cls
+    return DEFAULT
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and credentials:
+                return credentials
+    return None
+
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+        # (client key, class) -> (tokens, last refill time)
+        self.buckets: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+
+    def _take(self, key: Tuple[str, str], now: float) -> float:
+        """Spend one token. Returns 0 on success, otherwise seconds until a token is available."""
+        rate, burst = RATE_LIMITS[key[1]]
+        tokens, last = self.buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self.buckets[key] = (tokens, now)
+        while len(self.buckets) > MAX_TRACKED_BUCKETS:
+            self.buckets.popitem(last=False)
+        return wait
+
+    def _overloaded(self, cls: str) -> bool:
+        if self.in_flight >= MAX_IN_FLIGHT * SHED_AT[cls]:
+            return True
+        return cls != CHEAP and pool_wait_ms() > DB_POOL_WAIT_SHED_MS
+
+    async def _reject(self, send, status: int, retry_after: float, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        token = _bearer_token(scope)
+        subject = decode_token(token) if token else None
+        state = scope.setdefault("state", {})
+        if token:
+            state["token_subject"] = subject
+
+        cls = classify(scope["path"])
+        client = scope.get("client")
+        client_key = f"user:{subject}" if subject else f"ip:{client[0] if client else 'unknown'}"
+        wait = self._take((client_key, cls), time.monotonic())
+        if wait:
+            await self._reject(send, 429, wait, "Too many requests")
+            return
+        if self._overloaded(cls):
+            await self._reject(send, 503, 1, "Server is busy, please retry")
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+def _gzip(body: bytes) -> bytes:
+    import gzip
+    return gzip.compress(body, compresslevel=6)
+
+def _brotli(body: bytes) -> bytes:
+    import brotli
+    return brotli.compress(body, quality=5)
+
+def _zstd(body: bytes) -> bytes:
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).compress(body)
+
+def _available_codecs():
+    """Preferred first. brotli and zstandard are optional packages."""
+    codecs = []
+    for name, module, fn in (("zstd", "zstandard", _zstd), ("br", "brotli", _brotli)):
+        try:
+            __import__(module)
+            codecs.append((name, fn))
+        except ImportError:
+            pass
+    codecs.append(("gzip", _gzip))
+    return codecs
+
+CODECS = _available_codecs()
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the preferred codec the client accepts with a non-zero q-value."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for name, _ in CODECS:
+        if accepted.get(name, accepted.get("*", 0)) > 0:
+            return name
+    return None
+
+class CompressionMiddleware:
+    """Compress complete (non-streaming) responses above COMPRESSION_MIN_SIZE."""
+
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+        encoding = negotiate_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            headers = start["headers"]
+            body = message.get("body", b"")
+            already_encoded = any(k.lower() == b"content-encoding" for k, _ in headers)
+            # Streaming responses and small or pre-encoded bodies go out untouched
+            if message.get("more_body") or already_encoded or len(body) < self.min_size:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            compressed = dict(CODECS)[encoding](body)
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Date, CheckConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Date, Float, LargeBinary, CheckConstraint, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from .database import Base
 import enum
@@ -34,12 +34,16 @@ class Application(Base):
         CheckConstraint("length(location) <= 255", name="location_max_length"),
         CheckConstraint("length(source) <= 255 OR source IS NULL", name="source_max_length"),
         CheckConstraint("length(notes) <= 5000 OR notes IS NULL", name="notes_max_length"),
+        # Never reuse ids: archived rows keep theirs in applications_archive
+        {"sqlite_autoincrement": True},
     )
+    archived = False
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     company = Column(String(255), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=True, index=True)
     role = Column(String(255), nullable=False)
     location = Column(String(255), nullable=False)
     status = Column(Enum(AppStatus), default=AppStatus.APPLIED, nullable=False)
@@ -50,9 +54,176 @@ class Application(Base):
     follow_up_date = Column(Date, nullable=True)
     follow_up_sent = Column(Integer, default=0)  # Number of follow-ups sent
     reminder_enabled = Column(Integer, default=1)  # 1 for enabled, 0 for disabled
-    notes = Column(Text, nullable=True)
+    notes = deferred(Column(Text, nullable=True))  # up to 5000 chars; only loaded when asked for
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User", back_populates="applications")
+
+
+class ApplicationEvent(Base):
+    """Append-only log of status transitions. Rows are never updated."""
+    __tablename__ = "application_events"
+    __table_args__ = (
+        Index("ix_application_events_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Not a foreign key: history outlives the application it describes
+    application_id = Column(Integer, nullable=False, index=True)
+    from_status = Column(Enum(AppStatus), nullable=True)  # None when the application is created
+    to_status = Column(Enum(AppStatus), nullable=False)
+    source = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class FunnelRollup(Base):
+    """Incrementally maintained per-stage counters, one row per (user, source, stage)."""
+    __tablename__ = "funnel_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "source", "stage", name="uq_funnel_rollup_user_source_stage"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    source = Column(String(255), nullable=False)  # "*" aggregates every source
+    stage = Column(Enum(AppStatus), nullable=False)
+    entered = Column(Integer, default=0, nullable=False)  # distinct applications that reached the stage
+    exited = Column(Integer, default=0, nullable=False)
+    total_days = Column(Float, default=0.0, nullable=False)
+    days_histogram = Column(Text, nullable=False, default="[]")  # JSON counts per DAYS_BUCKETS bucket
+
+class MailboxAccount(Base):
+    """IMAP mailbox polled by the background ingestion worker."""
+    __tablename__ = "mailbox_accounts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    host = Column(String(255), nullable=False)
+    port = Column(Integer, default=993, nullable=False)
+    use_ssl = Column(Integer, default=1, nullable=False)  # 1 for IMAPS, 0 for plain IMAP
+    username = Column(String(255), nullable=False)
+    encrypted_password = Column(Text, nullable=False)
+    folders = Column(String(1000), default="INBOX", nullable=False)  # comma separated
+    enabled = Column(Integer, default=1, nullable=False)
+    last_synced_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    folder_states = relationship("MailboxFolderState", back_populates="account", cascade="all, delete-orphan")
+
+class MailboxFolderState(Base):
+    """Per-folder high-water mark so each sync only fetches new messages."""
+    __tablename__ = "mailbox_folder_states"
+    __table_args__ = (
+        UniqueConstraint("account_id", "folder", name="uq_mailbox_folder"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("mailbox_accounts.id"), nullable=False)
+    folder = Column(String(255), nullable=False)
+    uidvalidity = Column(Integer, nullable=True)
+    last_uid = Column(Integer, default=0, nullable=False)
+
+    account = relationship("MailboxAccount", back_populates="folder_states")
+
+class Resume(Base):
+    """A user's resume and its hashed term-frequency vector for server-side matching."""
+    __tablename__ = "resumes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
+    content_hash = Column(String(64), nullable=False)
+    text = Column(Text, nullable=False)
+    vector_indices = Column(LargeBinary, nullable=False)  # int32 feature ids
+    vector_values = Column(LargeBinary, nullable=False)  # float32 term weights
+    skills = Column(Text, nullable=False, default="[]")  # JSON list of skill ids
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class JobDescription(Base):
+    """Job description attached to an application, vectorized once when it is saved."""
+    __tablename__ = "job_descriptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    application_id = Column(Integer, ForeignKey("applications.id"), nullable=False, unique=True)
+    content_hash = Column(String(64), nullable=False)
+    text = Column(Text, nullable=False)
+    vector_indices = Column(LargeBinary, nullable=False)
+    vector_values = Column(LargeBinary, nullable=False)
+    skills = Column(Text, nullable=False, default="[]")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Job(Base):
+    """Durable background job. Workers claim rows with a time-limited lease."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String(20), default="queued", nullable=False)  # queued, running, succeeded, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    lease_expires_at = Column(DateTime, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    notify_url = Column(String(2000), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class ArchivedApplication(Base):
+    """Closed applications moved out of the hot table by services/archive.py. Same columns, same ids."""
+    __tablename__ = "applications_archive"
+    archived = True
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+    company = Column(String(255), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=True, index=True)
+    role = Column(String(255), nullable=False)
+    location = Column(String(255), nullable=False)
+    status = Column(Enum(AppStatus), nullable=False)
+    source = Column(String(255), nullable=True)
+    applied_date = Column(Date, nullable=True)
+    next_action_date = Column(Date, nullable=True)
+    last_contact_date = Column(Date, nullable=True)
+    follow_up_date = Column(Date, nullable=True)
+    follow_up_sent = Column(Integer, default=0)
+    reminder_enabled = Column(Integer, default=1)
+    notes = deferred(Column(Text, nullable=True))
+
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class Company(Base):
+    """One row per normalized company name, with counters maintained by services/companies.py."""
+    __tablename__ = "companies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    normalized_key = Column(String(255), unique=True, index=True, nullable=False)
+    name = Column(String(255), nullable=False)  # first spelling seen
+    application_count = Column(Integer, default=0, nullable=False, index=True)  # across all users
+    user_count = Column(Integer, default=0, nullable=False, index=True)  # distinct users applying
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class UserCompanyStat(Base):
+    """Per-user application count for one company."""
+    __tablename__ = "user_company_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "company_id", name="uq_user_company"),
+        Index("ix_user_company_stats_user_count", "user_id", "application_count"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    application_count = Column(Integer, default=0, nullable=False)
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from pydantic import AnyHttpUrl, BaseModel
+from typing import Optional
 from sqlalchemy.orm import Session
 from ..deps import get_db, get_current_user
 from .. import models
+from ..services.cover_letter import CoverLetterConfigError, build_prompt, generate_cover_letter as write_cover_letter
+from ..services.jobs import NotifyTargetError, enqueue
+from ..services.matching import score_text
 import os
 
 router = APIRouter(prefix="/ai", tags=["ai"])
@@ -35,37 +40,34 @@ def ai_test():
 @router.post("/cover-letter")
 def generate_cover_letter(
     req: CoverLetterReq,
+    async_mode: bool = Query(False, alias="async", description="Queue generation and return a job id immediately"),
+    notify_url: Optional[AnyHttpUrl] = Query(None, description="URL to POST to when an async job finishes"),
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user)
 ):
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-    
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=key)
-        
-        prompt = f"""Write a professional cover letter for {req.your_name}.
-
-Resume Summary: {req.resume_summary}
-Company: {req.company or 'the company'}
-Role: {req.role or 'the position'}
+    if async_mode:
+        payload = req.model_dump() if hasattr(req, 'model_dump') else req.dict()
+        try:
+            job = enqueue(db, user.id, "cover_letter", payload, notify_url=str(notify_url) if notify_url else None)
+        except NotifyTargetError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status})
 
-Job Description:
-{req.job_description}
-
-Make it personalized, professional, and highlight relevant skills from the resume summary that match the job description. Keep it concise and engaging."""
-
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=800,
-            temperature=0.7
+    try:
+        prompt, prompt_tokens = build_prompt(
+            your_name=req.your_name,
+            resume_summary=req.resume_summary,
+            job_description=req.job_description,
+            company=req.company,
+            role=req.role,
         )
-        
-        cover_letter = response.choices[0].message.content
-        return {"cover_letter": cover_letter}
-        
+        cover_letter = write_cover_letter(prompt)
+        return {
+            "cover_letter": cover_letter,
+            "prompt_tokens": prompt_tokens,
+            "match": score_text(db, user.id, req.job_description),
+        }
+    except CoverLetterConfigError as e:
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate cover letter: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to generate cover letter: {str(e)}")
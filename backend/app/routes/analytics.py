@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+from .. import models, schemas
+from ..deps import get_db, get_current_user
+from ..services.companies import normalize_company
+from ..services.funnel import ALL_SOURCES, get_funnel, list_sources
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/funnel", response_model=schemas.FunnelRead)
+def read_funnel(source: str = ALL_SOURCES, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    return get_funnel(db, user.id, source)
+
+@router.get("/funnel/sources", response_model=List[str])
+def read_funnel_sources(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    return list_sources(db, user.id)
+
+@router.get("/companies", response_model=List[schemas.CompanyCount])
+def read_top_companies(limit: int = Query(20, ge=1, le=200), db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    rows = db.query(models.UserCompanyStat.company_id, models.Company.name, models.UserCompanyStat.application_count).join(
+        models.Company, models.Company.id == models.UserCompanyStat.company_id
+    ).filter(
+        models.UserCompanyStat.user_id == user.id,
+        models.UserCompanyStat.application_count > 0,
+    ).order_by(models.UserCompanyStat.application_count.desc()).limit(limit).all()
+    return [{"company_id": r[0], "name": r[1], "application_count": r[2]} for r in rows]
+
+@router.get("/companies/popular", response_model=List[schemas.CompanyStats])
+def read_popular_companies(limit: int = Query(20, ge=1, le=200), db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    rows = db.query(models.Company).filter(models.Company.user_count > 0).order_by(models.Company.user_count.desc()).limit(limit).all()
+    return [{"company_id": c.id, "name": c.name, "application_count": c.application_count, "user_count": c.user_count} for c in rows]
+
+@router.get("/companies/lookup", response_model=schemas.CompanyStats)
+def lookup_company(name: str = Query(..., min_length=1), db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    company = db.query(models.Company).filter(models.Company.normalized_key == normalize_company(name)).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    return {"company_id": company.id, "name": company.name, "application_count": company.application_count, "user_count": company.user_count}
@@ -1,53 +1,171 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import func, literal
+from sqlalchemy.orm import Session, undefer
+from typing import List, Optional
+from datetime import datetime
+import csv
+import heapq
+import io
 from .. import models, schemas
+from ..database import SessionLocal
 from ..deps import get_db, get_current_user
+from ..services.companies import assign_company, release_company
+from ..services.funnel import record_status_change
+from ..services.matching import forget_application, save_job_description
 
 router = APIRouter(prefix="/applications", tags=["applications"])
 
+FIELDS_DESCRIPTION = "Comma separated subset of ApplicationRead fields, e.g. id,company,role,status"
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a ?fields= projection. None means the full ApplicationRead representation."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in schemas.ApplicationRead.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # Keep "id" so clients can always address the row
+    return ["id"] + [f for f in dict.fromkeys(requested) if f != "id"]
+
+def project(obj: models.Application, fields: List[str]) -> dict:
+    return jsonable_encoder({f: getattr(obj, f) for f in fields})
+
+def _columns(model, fields: List[str]):
+    return [literal(model.archived).label(f) if f == "archived" else getattr(model, f) for f in fields]
+
+def _valid(model, user_id: int):
+    # Skip invalid records that don't meet new validation requirements
+    return [
+        model.user_id == user_id,
+        func.length(func.trim(model.company)) >= 2,
+        func.length(func.trim(model.role)) >= 2,
+        func.length(func.trim(model.location)) >= 2,
+    ]
+
 @router.get("/", response_model=List[schemas.ApplicationRead])
-def list_applications(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
-    applications = db.query(models.Application).filter(models.Application.user_id == user.id).order_by(models.Application.updated_at.desc()).all()
-    # Filter out invalid records that don't meet new validation requirements
-    valid_applications = []
-    for app in applications:
-        if (app.company and len(app.company.strip()) >= 2 and 
-            app.role and len(app.role.strip()) >= 2 and
-            app.location and len(app.location.strip()) >= 2):
-            valid_applications.append(app)
-    return valid_applications
+def list_applications(
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description="Also return closed applications moved to the archive"),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    selected = parse_fields(fields)
+    sources = [models.Application, models.ArchivedApplication] if include_archived else [models.Application]
+    if selected is None:
+        results = [
+            db.query(model).options(undefer(model.notes)).filter(*_valid(model, user.id)).order_by(model.updated_at.desc()).all()
+            for model in sources
+        ]
+        return list(heapq.merge(*results, key=lambda a: a.updated_at or datetime.min, reverse=True))
+    # Sparse fieldset: select only the requested columns and skip ORM object construction
+    rows = []
+    for model in sources:
+        query = db.query(*_columns(model, selected), model.updated_at.label("_sort")).filter(*_valid(model, user.id))
+        rows.extend(query.order_by(model.updated_at.desc()).all())
+    if include_archived:
+        rows.sort(key=lambda r: r[-1] or datetime.min, reverse=True)
+    return JSONResponse(jsonable_encoder([dict(zip(selected, row[:-1])) for row in rows]))
+
+EXPORT_COLUMNS = list(schemas.ApplicationRead.model_fields)
+
+@router.get("/export")
+def export_applications(
+    include_archived: bool = Query(True, description="Include closed applications moved to the archive"),
+    user: models.User = Depends(get_current_user),
+):
+    """Stream every application as CSV, hot rows first, then the archive."""
+    sources = [models.Application, models.ArchivedApplication] if include_archived else [models.Application]
+    user_id = user.id
+
+    def rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        # Own session: request-scoped dependencies are closed before a streamed body is sent
+        db = SessionLocal()
+        try:
+            for model in sources:
+                query = db.query(*_columns(model, EXPORT_COLUMNS)).filter(model.user_id == user_id).order_by(model.id)
+                for row in query.yield_per(500):
+                    writer.writerow(jsonable_encoder(list(row)))
+                    if buffer.tell() > 64 * 1024:
+                        yield buffer.getvalue()
+                        buffer.seek(0); buffer.truncate()
+        finally:
+            db.close()
+        yield buffer.getvalue()
+
+    return StreamingResponse(rows(), media_type="text/csv",
+                             headers={"Content-Disposition": "attachment; filename=applications.csv"})
 
 @router.post("/", response_model=schemas.ApplicationRead)
-def create_application(app: schemas.ApplicationCreate, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+def create_application(
+    app: schemas.ApplicationCreate,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    selected = parse_fields(fields)
     try:
         app_data = app.model_dump() if hasattr(app, 'model_dump') else app.dict()
+        job_description = app_data.pop("job_description", None)
         obj = models.Application(user_id=user.id, **app_data)
-        db.add(obj); db.commit(); db.refresh(obj)
-        return obj
+        db.add(obj); db.flush()
+        assign_company(db, obj)
+        record_status_change(db, obj, None, obj.status)
+        if job_description:
+            save_job_description(db, obj, job_description)
+        db.commit(); db.refresh(obj)
+        return JSONResponse(project(obj, selected)) if selected else obj
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating application: {str(e)}")
 
 @router.patch("/{app_id}", response_model=schemas.ApplicationRead)
-def update_application(app_id: int, patch: schemas.ApplicationUpdate, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+def update_application(
+    app_id: int,
+    patch: schemas.ApplicationUpdate,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    selected = parse_fields(fields)
     obj = db.query(models.Application).filter(models.Application.id == app_id, models.Application.user_id == user.id).first()
     if not obj:
         raise HTTPException(status_code=404, detail="Application not found")
     try:
         patch_data = patch.model_dump(exclude_unset=True) if hasattr(patch, 'model_dump') else patch.dict(exclude_unset=True)
+        previous_status = obj.status
+        if "job_description" in patch_data:
+            save_job_description(db, obj, patch_data.pop("job_description"))
         for k, v in patch_data.items():
             setattr(obj, k, v)
+        if patch_data.get("company"):
+            assign_company(db, obj)
+        if "status" in patch_data and patch_data["status"] is not None:
+            record_status_change(db, obj, previous_status, models.AppStatus(obj.status))
         db.commit(); db.refresh(obj)
-        return obj
+        return JSONResponse(project(obj, selected)) if selected else obj
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating application: {str(e)}")
 
+@router.get("/{app_id}/events", response_model=List[schemas.ApplicationEventRead])
+def list_application_events(app_id: int, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    return db.query(models.ApplicationEvent).filter(
+        models.ApplicationEvent.application_id == app_id,
+        models.ApplicationEvent.user_id == user.id,
+    ).order_by(models.ApplicationEvent.created_at, models.ApplicationEvent.id).all()
+
 @router.delete("/{app_id}")
 def delete_application(app_id: int, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
     obj = db.query(models.Application).filter(models.Application.id == app_id, models.Application.user_id == user.id).first()
     if not obj:
         raise HTTPException(status_code=404, detail="Application not found")
+    forget_application(db, obj)
+    release_company(db, obj)
     db.delete(obj); db.commit()
     return {"ok": True}
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import AnyHttpUrl, BaseModel
 from ..deps import get_db, get_current_user
-from ..services.email_parser import parse_email
+from ..services.ingest import IngestError, ingest_email as services_ingest_email
+from ..services.jobs import NotifyTargetError, enqueue
+from ..services.mail_sync import mailbox_address
+from ..utils.network import BlockedAddressError
+from ..utils.security import encrypt_secret
 from .. import models, schemas
 
 router = APIRouter(prefix="/emails", tags=["emails"])
@@ -10,48 +16,54 @@ router = APIRouter(prefix="/emails", tags=["emails"])
 class EmailIngestRequest(BaseModel):
     email_text: str
 
-@router.post("/ingest", response_model=schemas.ApplicationRead)
+@router.post("/ingest", response_model=schemas.ApplicationRead, responses={202: {"model": schemas.JobAccepted}})
 def ingest_email(
     request: EmailIngestRequest,
+    async_mode: bool = Query(False, alias="async", description="Queue the parse and return a job id immediately"),
+    notify_url: Optional[AnyHttpUrl] = Query(None, description="URL to POST to when an async job finishes"),
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user)
 ):
-    from fastapi import HTTPException
-    
-    parsed = parse_email(request.email_text)
-    company = parsed.get("company")
-    role = parsed.get("role")
-    location = parsed.get("location") or "Remote"  # Default location since it's required
-    
-    # Validation: Reject if company or role couldn't be extracted
-    if not company or company.strip().lower() in ['unknown company', 'unknown', '']:
-        raise HTTPException(
-            status_code=400, 
-            detail="Could not extract company name from email. Please ensure the email contains clear company information or add the application manually."
-        )
-    
-    if not role or role.strip().lower() in ['unknown role', 'unknown', '']:
-        raise HTTPException(
-            status_code=400, 
-            detail="Could not extract job role from email. Please ensure the email contains clear role information or add the application manually."
-        )
-    
-    # Use detected status from email parsing, fallback to APPLIED
-    detected_status = parsed.get("status", "APPLIED")
+    if async_mode:
+        try:
+            job = enqueue(db, user.id, "email_ingest", {"email_text": request.email_text},
+                          notify_url=str(notify_url) if notify_url else None)
+        except NotifyTargetError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status})
     try:
-        status = models.AppStatus(detected_status)
-    except ValueError:
-        # If the detected status is invalid, default to APPLIED
-        status = models.AppStatus.APPLIED
-    
-    app = models.Application(
+        return services_ingest_email(db, user.id, request.email_text)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/mailboxes", response_model=List[schemas.MailboxRead])
+def list_mailboxes(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    return db.query(models.MailboxAccount).filter(models.MailboxAccount.user_id == user.id).all()
+
+@router.post("/mailboxes", response_model=schemas.MailboxRead)
+def add_mailbox(mailbox: schemas.MailboxCreate, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    try:
+        mailbox_address(mailbox.host.strip(), mailbox.port)
+    except BlockedAddressError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    account = models.MailboxAccount(
         user_id=user.id,
-        company=company.strip(),
-        role=role.strip(),
-        location=location,
-        status=status
+        host=mailbox.host.strip(),
+        port=mailbox.port,
+        use_ssl=1 if mailbox.use_ssl else 0,
+        username=mailbox.username.strip(),
+        encrypted_password=encrypt_secret(mailbox.password),
+        folders=",".join(f.strip() for f in mailbox.folders if f.strip()) or "INBOX",
     )
-    db.add(app)
-    db.commit()
-    db.refresh(app)
-    return app
\ No newline at end of file
+    db.add(account); db.commit(); db.refresh(account)
+    return account
+
+@router.delete("/mailboxes/{mailbox_id}")
+def remove_mailbox(mailbox_id: int, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    account = db.query(models.MailboxAccount).filter(
+        models.MailboxAccount.id == mailbox_id, models.MailboxAccount.user_id == user.id
+    ).first()
+    if not account:
+        raise HTTPException(status_code=404, detail="Mailbox not found")
+    db.delete(account); db.commit()
+    return {"ok": True}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from .. import models, schemas
+from ..deps import get_db, get_current_user
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/{job_id}", response_model=schemas.JobRead)
+def get_job(job_id: int, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    job = db.query(models.Job).filter(models.Job.id == job_id, models.Job.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+import json
+from .. import models, schemas
+from ..deps import get_db, get_current_user
+from ..services.matching import SKILLS, rank_applications, save_job_description, save_resume
+
+router = APIRouter(prefix="/matching", tags=["matching"])
+
+@router.put("/resume", response_model=schemas.ResumeRead)
+def update_resume(body: schemas.ResumeUpdate, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    resume = save_resume(db, user.id, body.text)
+    db.commit(); db.refresh(resume)
+    return {
+        "content_hash": resume.content_hash,
+        "skills": [SKILLS[i] for i in json.loads(resume.skills)],
+        "updated_at": resume.updated_at,
+    }
+
+@router.put("/applications/{app_id}/job-description")
+def update_job_description(app_id: int, body: schemas.JobDescriptionUpdate, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    obj = db.query(models.Application).filter(models.Application.id == app_id, models.Application.user_id == user.id).first()
+    if not obj:
+        raise HTTPException(status_code=404, detail="Application not found")
+    save_job_description(db, obj, body.text)
+    db.commit()
+    return {"ok": True}
+
+@router.get("/rank", response_model=List[schemas.MatchResult])
+def rank(limit: int = Query(20, ge=1, le=1000), db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    return rank_applications(db, user.id, limit=limit)
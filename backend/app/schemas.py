@@ -1,3 +1,4 @@
+import json
 from pydantic import BaseModel, EmailStr, field_validator, Field
 from typing import Optional, List
 from datetime import date, datetime
@@ -110,7 +111,7 @@ class ApplicationBase(BaseModel):
         return v
 
 class ApplicationCreate(ApplicationBase):
-    pass
+    job_description: Optional[str] = Field(None, max_length=50000)
 
 class ApplicationUpdate(BaseModel):
     company: Optional[str] = Field(None, min_length=2, max_length=255)
@@ -125,6 +126,7 @@ class ApplicationUpdate(BaseModel):
     follow_up_sent: Optional[int] = None
     reminder_enabled: Optional[bool] = None
     notes: Optional[str] = Field(None, max_length=5000)
+    job_description: Optional[str] = Field(None, max_length=50000)
     
     @field_validator('company', 'role', 'location')
     @classmethod
@@ -147,6 +149,7 @@ class ApplicationRead(BaseModel):
     id: int
     user_id: int
     company: str
+    company_id: Optional[int] = None
     role: str
     location: str
     status: AppStatus = AppStatus.APPLIED
@@ -156,5 +159,113 @@ class ApplicationRead(BaseModel):
     notes: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    archived: bool = False
     class Config:
         from_attributes = True
+
+class ApplicationEventRead(BaseModel):
+    id: int
+    application_id: int
+    from_status: Optional[AppStatus] = None
+    to_status: AppStatus
+    source: Optional[str] = None
+    created_at: datetime
+    class Config:
+        from_attributes = True
+
+class FunnelStage(BaseModel):
+    stage: AppStatus
+    entered: int
+    exited: int
+    conversion_rate: Optional[float] = None
+    avg_days_in_stage: Optional[float] = None
+    median_days_in_stage: Optional[float] = Field(
+        None, description="Approximate: interpolated within day buckets, exact when there is one sample"
+    )
+
+class FunnelRead(BaseModel):
+    source: str
+    stages: List[FunnelStage]
+
+class MailboxCreate(BaseModel):
+    host: str = Field(..., min_length=1, max_length=255)
+    port: int = Field(993, ge=1, le=65535)
+    use_ssl: bool = True
+    username: str = Field(..., min_length=1, max_length=255)
+    password: str = Field(..., min_length=1)
+    folders: List[str] = ["INBOX"]
+
+class MailboxRead(BaseModel):
+    id: int
+    host: str
+    port: int
+    use_ssl: bool
+    username: str
+    folders: List[str]
+    enabled: bool
+    last_synced_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    @field_validator('folders', mode='before')
+    @classmethod
+    def split_folders(cls, v):
+        if isinstance(v, str):
+            return [f for f in v.split(",") if f]
+        return v
+
+    class Config:
+        from_attributes = True
+
+class ResumeUpdate(BaseModel):
+    text: str = Field(..., min_length=1, max_length=100000)
+
+class ResumeRead(BaseModel):
+    content_hash: str
+    skills: List[str]
+    updated_at: datetime
+
+class JobDescriptionUpdate(BaseModel):
+    text: str = Field(..., max_length=50000)
+
+class MatchResult(BaseModel):
+    application_id: int
+    company: str
+    role: str
+    status: AppStatus
+    score: float
+    matched_skills: List[str]
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    @field_validator('result', mode='before')
+    @classmethod
+    def load_result(cls, v):
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+    class Config:
+        from_attributes = True
+
+class JobAccepted(BaseModel):
+    job_id: int
+    status: str
+
+class CompanyCount(BaseModel):
+    company_id: int
+    name: str
+    application_count: int
+
+class CompanyStats(BaseModel):
+    company_id: int
+    name: str
+    application_count: int
+    user_count: int
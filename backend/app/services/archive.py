@@ -0,0 +1,108 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, inspect, insert, literal, select, text
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import Session
+from .. import models
+from .matching import publish_changes
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+CLOSED_STATUSES = [models.AppStatus.REJECTED, models.AppStatus.ACCEPTED]
+COLUMNS = [c.name for c in models.Application.__table__.columns]
+
+class ArchiveIdError(RuntimeError):
+    """The hot table can hand out ids that already belong to archived rows."""
+
+def _table_sql(conn, table: str) -> str:
+    row = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table}).first()
+    return row[0] if row else ""
+
+def ids_are_stable(conn) -> bool:
+    """
+    SQLite only stops reusing the highest freed id on AUTOINCREMENT tables, and
+    sqlite_autoincrement in the model does nothing for tables created earlier.
+    """
+    if conn.dialect.name != "sqlite":
+        return True
+    return "AUTOINCREMENT" in _table_sql(conn, "applications").upper()
+
+def ensure_autoincrement(engine):
+    """
+    Rebuild an applications table created without AUTOINCREMENT, then seed its
+    sequence past every id used by either table so archived ids are never reissued.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    hot = models.Application.__table__
+    # pysqlite doesn't open a transaction before DDL, so manage it by hand
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            if ids_are_stable(conn):
+                conn.exec_driver_sql("ROLLBACK")
+                return
+            existing = {c["name"] for c in inspect(conn).get_columns("applications")}
+            columns = ", ".join(c for c in COLUMNS if c in existing)
+            ddl = str(CreateTable(hot).compile(dialect=conn.dialect))
+            conn.exec_driver_sql(ddl.replace("CREATE TABLE applications ", "CREATE TABLE applications_rebuild ", 1))
+            conn.exec_driver_sql(f"INSERT INTO applications_rebuild ({columns}) SELECT {columns} FROM applications")
+            conn.exec_driver_sql("DROP TABLE applications")
+            conn.exec_driver_sql("ALTER TABLE applications_rebuild RENAME TO applications")
+            for index in hot.indexes:
+                index.create(conn)
+            high_water = conn.exec_driver_sql(
+                "SELECT max(coalesce((SELECT max(id) FROM applications), 0),"
+                " coalesce((SELECT max(id) FROM applications_archive), 0))"
+            ).scalar()
+            conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'applications'")
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('applications', :seq)"), {"seq": high_water})
+            conn.exec_driver_sql("COMMIT")
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+
+def archive_closed_applications(
+    db: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+) -> int:
+    """
+    Move REJECTED/ACCEPTED applications untouched for `older_than_days` into
+    applications_archive, one committed batch at a time. Returns rows moved.
+    """
+    if not ids_are_stable(db.connection()):
+        raise ArchiveIdError("applications table reuses ids; run archive_applications.py to migrate it first")
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    hot = models.Application.__table__
+    last_touched = func.coalesce(hot.c.updated_at, hot.c.created_at)
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = db.execute(
+            select(hot.c.id, hot.c.user_id)
+            .where(hot.c.status.in_(CLOSED_STATUSES), last_touched < cutoff)
+            .order_by(hot.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        ids = [r.id for r in rows]
+        db.execute(
+            insert(models.ArchivedApplication.__table__).from_select(
+                COLUMNS + ["archived_at"],
+                select(*[hot.c[name] for name in COLUMNS], literal(datetime.utcnow())).where(hot.c.id.in_(ids)),
+            )
+        )
+        # Closed applications drop out of resume matching
+        db.execute(delete(models.JobDescription).where(models.JobDescription.application_id.in_(ids)))
+        db.execute(delete(models.Application).where(models.Application.id.in_(ids)))
+        db.commit()
+        for user_id in {r.user_id for r in rows}:
+            publish_changes(user_id, [r.id for r in rows if r.user_id == user_id])
+        moved += len(ids)
+        batches += 1
+    return moved
@@ -0,0 +1,120 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from .. import models
+from ..utils.db import get_or_create
+
+LEGAL_SUFFIXES = re.compile(
+    r"[\s,]+(inc|incorporated|llc|l\.l\.c|ltd|limited|corp|corporation|co|company|gmbh|plc|s\.a|ag)\.?$"
+)
+
+def normalize_company(name: str) -> str:
+    """Case-, whitespace- and legal-suffix-insensitive key: "  ACME,  Inc. " -> "acme"."""
+    key = unicodedata.normalize("NFKC", name).lower()
+    key = re.sub(r"\s+", " ", key).strip(" .,;:-")
+    stripped = LEGAL_SUFFIXES.sub("", key).strip(" .,;:-")
+    return (stripped or key)[:255]
+
+def get_or_create_company(db: Session, name: str) -> models.Company:
+    key = normalize_company(name)
+    return get_or_create(db, models.Company, defaults={
+        "name": name.strip()[:255], "application_count": 0, "user_count": 0,
+    }, normalized_key=key)
+
+def _adjust(db: Session, user_id: int, company_id: int, delta: int):
+    stat = get_or_create(db, models.UserCompanyStat, defaults={"application_count": 0},
+                         user_id=user_id, company_id=company_id)
+    # Read the new count back from the same UPDATE so concurrent writers (API, mailbox
+    # sync) each see their own transition; a count already at 0 is left alone
+    after = db.execute(
+        update(models.UserCompanyStat)
+        .where(
+            models.UserCompanyStat.id == stat.id,
+            models.UserCompanyStat.application_count + delta >= 0,
+        )
+        .values(application_count=models.UserCompanyStat.application_count + delta)
+        .returning(models.UserCompanyStat.application_count)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if after is None:
+        return
+    before = after - delta
+    users_delta = 1 if before == 0 and after > 0 else -1 if before > 0 and after == 0 else 0
+    db.execute(
+        update(models.Company)
+        .where(models.Company.id == company_id)
+        .values(
+            application_count=models.Company.application_count + delta,
+            user_count=models.Company.user_count + users_delta,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def assign_company(db: Session, app):
+    """Point an application (hot or archived) at its company row and move the counters."""
+    company = get_or_create_company(db, app.company)
+    if app.company_id == company.id:
+        return
+    if app.company_id is not None:
+        _adjust(db, app.user_id, app.company_id, -1)
+    app.company_id = company.id
+    _adjust(db, app.user_id, company.id, 1)
+
+def release_company(db: Session, app):
+    """Call before deleting an application."""
+    if app.company_id is not None:
+        _adjust(db, app.user_id, app.company_id, -1)
+
+def ensure_company_columns(engine):
+    """Add company_id to tables created before the companies table existed."""
+    inspector = inspect(engine)
+    for table in ("applications", "applications_archive"):
+        if not inspector.has_table(table):
+            continue
+        if "company_id" in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN company_id INTEGER REFERENCES companies(id)"))
+        except OperationalError as e:
+            # Several workers starting against an old database race to add it; one wins
+            if "duplicate column" not in str(e).lower():
+                raise
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_company_id ON {table} (company_id)"))
+
+def backfill_companies(db: Session, batch_size: int = 500, max_batches: Optional[int] = None) -> int:
+    """Assign companies to rows that have none, one committed batch per model at a time."""
+    done = 0
+    batches = 0
+    for model in (models.Application, models.ArchivedApplication):
+        table = model.__table__
+        while max_batches is None or batches < max_batches:
+            rows = db.execute(
+                select(table.c.id, table.c.user_id, table.c.company)
+                .where(table.c.company_id.is_(None))
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            by_company: Dict[int, List] = {}
+            for row in rows:
+                by_company.setdefault(get_or_create_company(db, row.company).id, []).append(row)
+            for company_id, linked in by_company.items():
+                # Core UPDATE that writes updated_at back unchanged: a migration must not
+                # reorder the list or restart the archive clock
+                db.execute(
+                    update(table)
+                    .where(table.c.id.in_([r.id for r in linked]))
+                    .values(company_id=company_id, updated_at=table.c.updated_at)
+                )
+                for row in linked:
+                    _adjust(db, row.user_id, company_id, 1)
+            db.commit()
+            done += len(rows)
+            batches += 1
+    return done
@@ -0,0 +1,59 @@
+import os
+from typing import Dict, Optional, Tuple
+from .prompt import compact_job_description, compact_resume, count_tokens, split_budget, token_report
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("COVER_LETTER_PROMPT_TOKENS", "1500"))
+RESUME_TOKEN_BUDGET = int(os.getenv("COVER_LETTER_RESUME_TOKENS", "400"))
+
+PROMPT_TEMPLATE = """Write a professional cover letter for {your_name}.
+
+Resume Summary: {resume_summary}
+Company: {company}
+Role: {role}
+
+Job Description:
+{job_description}
+
+Make it personalized, professional, and highlight relevant skills from the resume summary that match the job description. Keep it concise and engaging."""
+
+class CoverLetterConfigError(RuntimeError):
+    """The upstream model is not configured; retrying will not help."""
+
+def build_prompt(
+    your_name: str,
+    resume_summary: str,
+    job_description: str,
+    company: Optional[str] = None,
+    role: Optional[str] = None,
+    budget: int = PROMPT_TOKEN_BUDGET,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Fill the prompt template with a compacted resume summary and job description
+    that fit `budget` tokens. Returns the prompt and a token report.
+    """
+    fields = {"your_name": your_name, "company": company or 'the company', "role": role or 'the position'}
+    original = PROMPT_TEMPLATE.format(resume_summary=resume_summary, job_description=job_description, **fields)
+    fixed = count_tokens(PROMPT_TEMPLATE.format(resume_summary="", job_description="", **fields))
+    resume_budget, job_budget = split_budget(budget, fixed, RESUME_TOKEN_BUDGET)
+    prompt = PROMPT_TEMPLATE.format(
+        resume_summary=compact_resume(resume_summary, resume_budget),
+        job_description=compact_job_description(job_description, job_budget),
+        **fields,
+    )
+    return prompt, token_report(original, prompt)
+
+def generate_cover_letter(prompt: str) -> str:
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise CoverLetterConfigError("OpenAI API key not configured")
+
+    from openai import OpenAI
+    client = OpenAI(api_key=key)
+
+    response = client.chat.completions.create(
+        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=800,
+        temperature=0.7
+    )
+    return response.choices[0].message.content
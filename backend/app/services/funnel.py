@@ -0,0 +1,184 @@
+import json
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from .. import models
+from ..utils.db import get_or_create
+
+ALL_SOURCES = "*"
+UNKNOWN_SOURCE = "Unknown"
+
+# Ordered happy path used for stage-to-stage conversion rates
+FUNNEL_ORDER = [
+    models.AppStatus.APPLIED,
+    models.AppStatus.INTERVIEWING,
+    models.AppStatus.OFFER,
+    models.AppStatus.ACCEPTED,
+]
+
+# Upper bounds (in days) of the time-in-stage histogram buckets; the last bucket is open-ended
+DAYS_BUCKETS = [1, 2, 3, 5, 7, 10, 14, 21, 30, 45, 60, 90, 180, 365]
+
+def _bucket_index(days: float) -> int:
+    for i, upper in enumerate(DAYS_BUCKETS):
+        if days < upper:
+            return i
+    return len(DAYS_BUCKETS)
+
+def _rollup_id(db: Session, user_id: int, source: str, stage: models.AppStatus) -> int:
+    return get_or_create(db, models.FunnelRollup, defaults={
+        "entered": 0, "exited": 0, "total_days": 0.0,
+        "days_histogram": json.dumps([0] * (len(DAYS_BUCKETS) + 1)),
+    }, user_id=user_id, source=source, stage=stage).id
+
+def _bump_rollup(db: Session, rollup_id: int, entered: int = 0, days: Optional[float] = None):
+    """Increment a rollup in the database so concurrent writers (API, mailbox sync) don't lose counts."""
+    values = {"entered": models.FunnelRollup.entered + entered}
+    if days is not None:
+        bucket = _bucket_index(days)
+        histogram = models.FunnelRollup.days_histogram
+        values["exited"] = models.FunnelRollup.exited + 1
+        values["total_days"] = models.FunnelRollup.total_days + days
+        if db.get_bind().dialect.name == "sqlite":
+            path = f"$[{bucket}]"
+            values["days_histogram"] = func.json_set(histogram, path, func.coalesce(func.json_extract(histogram, path), 0) + 1)
+        else:
+            # No portable JSON arithmetic; hold the row lock for the read-modify-write instead
+            current = json.loads(db.query(histogram).filter(models.FunnelRollup.id == rollup_id).with_for_update().scalar())
+            current[bucket] += 1
+            values["days_histogram"] = json.dumps(current)
+    db.execute(
+        update(models.FunnelRollup)
+        .where(models.FunnelRollup.id == rollup_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+def _last_entered_at(db: Session, app: models.Application, stage: models.AppStatus) -> datetime:
+    event = db.query(models.ApplicationEvent).filter(
+        models.ApplicationEvent.application_id == app.id,
+        models.ApplicationEvent.to_status == stage,
+    ).order_by(models.ApplicationEvent.created_at.desc()).first()
+    if event:
+        return event.created_at
+    return app.created_at or datetime.utcnow()
+
+def _add_event(db: Session, app: models.Application, from_status, to_status, at: datetime):
+    """Append one event and fold it into the rollups for the overall and per-source funnels."""
+    reached_before = db.query(models.ApplicationEvent.id).filter(
+        models.ApplicationEvent.application_id == app.id,
+        models.ApplicationEvent.to_status == to_status,
+    ).first() is not None
+    days = None
+    if from_status is not None:
+        days = max((at - _last_entered_at(db, app, from_status)).total_seconds() / 86400, 0.0)
+
+    source = app.source or UNKNOWN_SOURCE
+    db.add(models.ApplicationEvent(
+        user_id=app.user_id,
+        application_id=app.id,
+        from_status=from_status,
+        to_status=to_status,
+        source=app.source,
+        created_at=at,
+    ))
+    db.flush()
+    for key in (ALL_SOURCES, source):
+        if not reached_before:
+            _bump_rollup(db, _rollup_id(db, app.user_id, key, to_status), entered=1)
+        if days is not None:
+            _bump_rollup(db, _rollup_id(db, app.user_id, key, from_status), days=days)
+
+def record_status_change(
+    db: Session,
+    app: models.Application,
+    from_status: Optional[models.AppStatus],
+    to_status: models.AppStatus,
+    at: Optional[datetime] = None,
+):
+    """
+    Record a status transition for an application. Pass from_status=None when the
+    application is created. The caller owns the transaction and must commit.
+    """
+    if from_status == to_status:
+        return
+    at = at or datetime.utcnow()
+    if app.id is None:
+        db.flush()
+    # Applications created before the event log existed get a synthetic creation event
+    if from_status is not None and not db.query(models.ApplicationEvent.id).filter(
+        models.ApplicationEvent.application_id == app.id
+    ).first():
+        _add_event(db, app, None, from_status, app.created_at or at)
+    _add_event(db, app, from_status, to_status, at)
+
+def backfill_events(db: Session) -> int:
+    """Seed a creation event for every application that has none. Returns the number seeded."""
+    seeded = db.query(models.Application.id).filter(
+        ~db.query(models.ApplicationEvent.id).filter(
+            models.ApplicationEvent.application_id == models.Application.id
+        ).exists()
+    ).all()
+    count = 0
+    for (app_id,) in seeded:
+        app = db.get(models.Application, app_id)
+        _add_event(db, app, None, app.status, app.created_at or datetime.utcnow())
+        count += 1
+    db.commit()
+    return count
+
+def _median_days(histogram: List[int], total_days: float) -> Optional[float]:
+    total = sum(histogram)
+    if not total:
+        return None
+    if total == 1:
+        return round(total_days, 2)
+    half = total / 2
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= half:
+            lower = DAYS_BUCKETS[i - 1] if i > 0 else 0
+            if i == len(DAYS_BUCKETS):
+                return float(lower)
+            # Linear interpolation inside the bucket, capped by the observed total: at least
+            # half the samples are >= the median, so it can't exceed total_days / ceil(n / 2)
+            estimate = lower + (DAYS_BUCKETS[i] - lower) * (half - seen) / count
+            return round(min(estimate, total_days / math.ceil(half)), 2)
+        seen += count
+    return None
+
+def get_funnel(db: Session, user_id: int, source: str = ALL_SOURCES) -> Dict:
+    """Read the precomputed rollups for one funnel; cost is bounded by the number of stages."""
+    rollups = {
+        r.stage: r for r in db.query(models.FunnelRollup).filter(
+            models.FunnelRollup.user_id == user_id,
+            models.FunnelRollup.source == source,
+        ).all()
+    }
+    stages = []
+    for stage in models.AppStatus:
+        rollup = rollups.get(stage)
+        entered = rollup.entered if rollup else 0
+        exited = rollup.exited if rollup else 0
+        conversion_rate = None
+        if stage in FUNNEL_ORDER[:-1] and entered:
+            next_stage = rollups.get(FUNNEL_ORDER[FUNNEL_ORDER.index(stage) + 1])
+            conversion_rate = round((next_stage.entered if next_stage else 0) / entered, 4)
+        stages.append({
+            "stage": stage.value,
+            "entered": entered,
+            "exited": exited,
+            "conversion_rate": conversion_rate,
+            "avg_days_in_stage": round(rollup.total_days / exited, 2) if rollup and exited else None,
+            "median_days_in_stage": _median_days(json.loads(rollup.days_histogram), rollup.total_days) if rollup else None,
+        })
+    return {"source": source, "stages": stages}
+
+def list_sources(db: Session, user_id: int) -> List[str]:
+    rows = db.query(models.FunnelRollup.source).filter(
+        models.FunnelRollup.user_id == user_id,
+        models.FunnelRollup.source != ALL_SOURCES,
+    ).distinct().all()
+    return sorted(r[0] for r in rows)
@@ -0,0 +1,49 @@
+from sqlalchemy.orm import Session
+from .. import models
+from .companies import assign_company
+from .email_parser import parse_email
+from .funnel import record_status_change
+
+class IngestError(ValueError):
+    """The email did not contain enough information to create an application."""
+
+def ingest_email(db: Session, user_id: int, email_text: str, commit: bool = True) -> models.Application:
+    """
+    Parse one pasted email and create an application from it. Commits on success
+    unless `commit` is False, in which case the caller owns the transaction.
+    """
+    parsed = parse_email(email_text)
+    company = parsed.get("company")
+    role = parsed.get("role")
+    location = parsed.get("location") or "Remote"  # Default location since it's required
+
+    # Validation: Reject if company or role couldn't be extracted
+    if not company or company.strip().lower() in ['unknown company', 'unknown', '']:
+        raise IngestError("Could not extract company name from email. Please ensure the email contains clear company information or add the application manually.")
+
+    if not role or role.strip().lower() in ['unknown role', 'unknown', '']:
+        raise IngestError("Could not extract job role from email. Please ensure the email contains clear role information or add the application manually.")
+
+    # Use detected status from email parsing, fallback to APPLIED
+    detected_status = parsed.get("status", "APPLIED")
+    try:
+        status = models.AppStatus(detected_status)
+    except ValueError:
+        # If the detected status is invalid, default to APPLIED
+        status = models.AppStatus.APPLIED
+
+    app = models.Application(
+        user_id=user_id,
+        company=company.strip(),
+        role=role.strip(),
+        location=location,
+        status=status
+    )
+    db.add(app)
+    db.flush()
+    assign_company(db, app)
+    record_status_change(db, app, None, status)
+    if commit:
+        db.commit()
+        db.refresh(app)
+    return app
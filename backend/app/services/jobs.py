@@ -0,0 +1,242 @@
+import http.client
+import json
+import logging
+import os
+import random
+import socket
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+from .. import models, schemas
+from ..database import SessionLocal
+from ..utils.network import BlockedAddressError, resolve_public_address
+from .cover_letter import CoverLetterConfigError, build_prompt, generate_cover_letter
+from .ingest import IngestError, ingest_email
+from .matching import score_text
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+NOTIFY_TIMEOUT = float(os.getenv("JOB_NOTIFY_TIMEOUT", "5"))
+# Optional comma-separated allowlist of notify_url hosts; empty allows any public host
+NOTIFY_ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv("JOB_NOTIFY_ALLOWED_HOSTS", "").split(",") if h.strip()}
+
+class NotifyTargetError(ValueError):
+    """notify_url points somewhere the worker must not call."""
+
+# Errors that will fail the same way on every attempt
+PERMANENT_ERRORS = (IngestError, CoverLetterConfigError, KeyError, TypeError)
+
+def _run_email_ingest(db: Session, job: models.Job, payload: dict) -> dict:
+    # run_next commits the application together with the job's success
+    app = ingest_email(db, job.user_id, payload["email_text"], commit=False)
+    return jsonable_encoder(schemas.ApplicationRead.model_validate(app))
+
+def _run_cover_letter(db: Session, job: models.Job, payload: dict) -> dict:
+    prompt, prompt_tokens = build_prompt(**payload)
+    cover_letter = generate_cover_letter(prompt)
+    return {
+        "cover_letter": cover_letter,
+        "prompt_tokens": prompt_tokens,
+        "match": score_text(db, job.user_id, payload["job_description"]),
+    }
+
+HANDLERS: Dict[str, Callable[[Session, models.Job, dict], dict]] = {
+    "email_ingest": _run_email_ingest,
+    "cover_letter": _run_cover_letter,
+}
+
+def resolve_notify_target(url: str) -> Tuple[str, str, int, str]:
+    """
+    Validate a callback URL and resolve it to one public address. Returns
+    (scheme, host, port, address). Private, loopback, link-local and other
+    non-global addresses are refused so users can't reach internal services.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise NotifyTargetError("notify_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if NOTIFY_ALLOWED_HOSTS and host not in NOTIFY_ALLOWED_HOSTS:
+        raise NotifyTargetError(f"notify_url host {host} is not allowed")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise NotifyTargetError("notify_url has an invalid port") from None
+    try:
+        return parts.scheme, host, port, resolve_public_address(host, port)
+    except BlockedAddressError as e:
+        raise NotifyTargetError(f"notify_url {e}") from None
+
+def enqueue(db: Session, user_id: int, kind: str, payload: dict,
+            notify_url: Optional[str] = None, max_attempts: int = 5) -> models.Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if notify_url:
+        resolve_notify_target(notify_url)
+    job = models.Job(
+        user_id=user_id,
+        kind=kind,
+        payload=json.dumps(payload),
+        status="queued",
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow(),
+        notify_url=notify_url,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def _fail_exhausted(db: Session, now: datetime):
+    """Jobs whose worker died on the last allowed attempt (OOM, SIGKILL) never run again."""
+    job_ids = db.execute(
+        update(models.Job)
+        .where(
+            models.Job.status == "running",
+            models.Job.lease_expires_at < now,
+            models.Job.attempts >= models.Job.max_attempts,
+        )
+        .values(
+            status="failed",
+            error="Worker stopped before finishing the last attempt",
+            finished_at=now,
+            lease_expires_at=None,
+            locked_by=None,
+        )
+        .returning(models.Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    for job_id in job_ids:
+        _notify(db.get(models.Job, job_id))
+
+def claim(db: Session, worker_id: str) -> Optional[models.Job]:
+    """
+    Atomically lease the next runnable job. Jobs whose lease expired (worker died)
+    are claimable again while attempts remain. Uses SKIP LOCKED where the database
+    supports it; SQLite serializes writers, so a single UPDATE ... RETURNING is
+    already atomic there.
+    """
+    now = datetime.utcnow()
+    _fail_exhausted(db, now)
+    runnable = or_(
+        (models.Job.status == "queued") & (models.Job.run_after <= now),
+        (models.Job.status == "running") & (models.Job.lease_expires_at < now),
+    ) & (models.Job.attempts < models.Job.max_attempts)
+    candidate = select(models.Job.id).where(runnable).order_by(models.Job.run_after, models.Job.id).limit(1)
+    if db.get_bind().dialect.name == "postgresql":
+        candidate = candidate.with_for_update(skip_locked=True)
+    job_id = db.execute(
+        update(models.Job)
+        .where(models.Job.id == candidate.scalar_subquery())
+        .where(runnable)
+        .values(
+            status="running",
+            attempts=models.Job.attempts + 1,
+            locked_by=worker_id,
+            lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+        )
+        .returning(models.Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.commit()
+    return db.get(models.Job, job_id) if job_id else None
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """Connects to an already vetted address so DNS can't change between check and use."""
+
+    def __init__(self, host, address, **kwargs):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host, address, **kwargs):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+def _notify(job: models.Job):
+    if not job.notify_url:
+        return
+    body = json.dumps({"job_id": job.id, "status": job.status}).encode()
+    try:
+        # Re-resolved at send time: the record may have changed since enqueue
+        scheme, host, port, address = resolve_notify_target(job.notify_url)
+        cls = _PinnedHTTPSConnection if scheme == "https" else _PinnedHTTPConnection
+        conn = cls(host, address, port=port, timeout=NOTIFY_TIMEOUT)
+        parts = urlsplit(job.notify_url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        try:
+            # Redirects are not followed; they could point anywhere
+            conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            conn.getresponse().close()
+        finally:
+            conn.close()
+    except (NotifyTargetError, OSError, http.client.HTTPException) as e:
+        logger.info("Job %s notification to %s failed: %s", job.id, job.notify_url, e)
+
+def _backoff(attempts: int) -> float:
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+def run_next(worker_id: str) -> bool:
+    """Claim and run one job. Returns False when the queue had nothing runnable."""
+    db = SessionLocal()
+    try:
+        job = claim(db, worker_id)
+        if not job:
+            return False
+        try:
+            result = HANDLERS[job.kind](db, job, json.loads(job.payload))
+        except Exception as e:
+            db.rollback()
+            job = db.get(models.Job, job.id)
+            job.error = str(e)[:2000]
+            if isinstance(e, PERMANENT_ERRORS) or job.attempts >= job.max_attempts:
+                job.status = "failed"
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = "queued"
+                job.run_after = datetime.utcnow() + timedelta(seconds=_backoff(job.attempts))
+            job.lease_expires_at = None
+            job.locked_by = None
+            db.commit()
+            if job.status == "failed":
+                _notify(job)
+            return True
+        # Handler writes and the job's success commit together, and only while we hold the lease
+        finished = db.execute(
+            update(models.Job)
+            .where(models.Job.id == job.id, models.Job.locked_by == worker_id, models.Job.status == "running")
+            .values(
+                status="succeeded",
+                result=json.dumps(result),
+                error=None,
+                finished_at=datetime.utcnow(),
+                lease_expires_at=None,
+                locked_by=None,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not finished:
+            # Our lease expired and another worker took the job over; let it report
+            db.rollback()
+            logger.warning("Job %s lease lost by %s", job.id, worker_id)
+            return True
+        db.commit()
+        db.refresh(job)
+        _notify(job)
+        return True
+    finally:
+        db.close()
@@ -0,0 +1,235 @@
+import email
+import imaplib
+import logging
+import os
+import re
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email import policy
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from .. import models
+from ..database import SessionLocal
+from ..utils.network import BlockedAddressError, resolve_public_address
+from ..utils.security import decrypt_secret
+from .companies import assign_company, normalize_company
+from .email_parser import parse_email
+from .funnel import record_status_change
+
+logger = logging.getLogger(__name__)
+
+FETCH_BATCH_SIZE = int(os.getenv("IMAP_FETCH_BATCH_SIZE", "200"))
+IMAP_TIMEOUT = float(os.getenv("IMAP_TIMEOUT", "30"))
+# Hosts exempt from the public-address check, e.g. a local IMAP stand-in or an internal mail server
+IMAP_ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv("IMAP_ALLOWED_HOSTS", "").split(",") if h.strip()}
+
+# Cheap header screen: only messages matching this get their body downloaded
+RECRUITING_HINTS = re.compile(
+    r"application|applying|applied|interview|position|role|opportunit|offer|recruit|"
+    r"talent|hiring|candida|career|job|greenhouse|lever\.co|workday|ashby|smartrecruiters|icims|jobvite",
+    re.IGNORECASE,
+)
+UID_RE = re.compile(rb"UID (\d+)")
+TAG_RE = re.compile(r"<[^>]+>")
+
+def is_likely_recruiting(headers: email.message.Message) -> bool:
+    return bool(RECRUITING_HINTS.search(f"{headers.get('Subject', '')} {headers.get('From', '')}"))
+
+def message_text(raw: bytes) -> str:
+    """Subject plus the plain-text body (HTML is stripped of tags as a fallback)."""
+    msg = email.message_from_bytes(raw, policy=policy.default)
+    body = msg.get_body(preferencelist=("plain", "html"))
+    text = ""
+    if body is not None:
+        try:
+            text = body.get_content()
+        except (LookupError, UnicodeDecodeError):
+            text = body.get_payload(decode=True).decode("utf-8", "replace")
+        if body.get_content_subtype() == "html":
+            text = TAG_RE.sub(" ", text)
+    return f"Subject: {msg.get('Subject', '')}\n{text}"
+
+def _fetch(conn: imaplib.IMAP4, uids: List[int], query: str) -> List[Tuple[int, bytes]]:
+    typ, data = conn.uid("FETCH", ",".join(str(u) for u in uids), query)
+    if typ != "OK":
+        raise imaplib.IMAP4.error(f"FETCH failed: {data!r}")
+    results = []
+    for item in data:
+        if isinstance(item, tuple):
+            match = UID_RE.search(item[0])
+            if match:
+                results.append((int(match.group(1)), item[1]))
+    return results
+
+def _chunks(items: List[int], size: int) -> Iterable[List[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def mailbox_address(host: str, port: int) -> Optional[str]:
+    """
+    Vetted address to connect to, or None for hosts in IMAP_ALLOWED_HOSTS. Raises
+    BlockedAddressError so users can't point the worker at internal hosts and ports.
+    """
+    if host.strip().lower() in IMAP_ALLOWED_HOSTS:
+        return None
+    return resolve_public_address(host, port)
+
+class _PinnedIMAP4(imaplib.IMAP4):
+    def __init__(self, host, port, address, timeout):
+        self.address = address
+        super().__init__(host, port, timeout=timeout)
+
+    def _create_socket(self, timeout):
+        return socket.create_connection((self.address or self.host, self.port), timeout)
+
+class _PinnedIMAP4_SSL(imaplib.IMAP4_SSL):
+    def __init__(self, host, port, address, timeout):
+        self.address = address
+        super().__init__(host, port, timeout=timeout)
+
+    def _create_socket(self, timeout):
+        sock = socket.create_connection((self.address or self.host, self.port), timeout)
+        return self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+
+def connect(account: models.MailboxAccount) -> imaplib.IMAP4:
+    # Resolved again at connect time; the record may have changed since the mailbox was added
+    address = mailbox_address(account.host, account.port)
+    cls = _PinnedIMAP4_SSL if account.use_ssl else _PinnedIMAP4
+    conn = cls(account.host, account.port, address, IMAP_TIMEOUT)
+    conn.login(account.username, decrypt_secret(account.encrypted_password))
+    return conn
+
+def describe_error(e: Exception) -> str:
+    """User-facing sync error. Raw socket errors would let users map internal ports."""
+    if isinstance(e, BlockedAddressError):
+        return str(e)
+    if isinstance(e, imaplib.IMAP4.error):
+        return "The mail server rejected the login or a command"
+    if isinstance(e, OSError):
+        return "Could not connect to the mail server"
+    return "Sync failed"
+
+def upsert_applications(db: Session, user_id: int, parsed_messages: List[Dict[str, Optional[str]]]) -> int:
+    """
+    Create or update applications for one batch of parsed emails, matching on
+    normalized company and role. Returns the number of applications created or changed.
+    """
+    existing = {
+        (normalize_company(a.company), a.role.strip().lower()): a
+        for a in db.query(models.Application).filter(models.Application.user_id == user_id).all()
+    }
+    changed = 0
+    for parsed in parsed_messages:
+        company = (parsed.get("company") or "").strip()
+        role = (parsed.get("role") or "").strip()
+        if len(company) < 2 or len(role) < 2 or company.lower() in ("unknown", "unknown company") \
+                or role.lower() in ("unknown", "unknown role"):
+            continue
+        try:
+            status = models.AppStatus(parsed.get("status") or "APPLIED")
+        except ValueError:
+            status = models.AppStatus.APPLIED
+        key = (normalize_company(company), role.lower())
+        app = existing.get(key)
+        if app is None:
+            app = models.Application(
+                user_id=user_id,
+                company=company[:255],
+                role=role[:255],
+                location=(parsed.get("location") or "Remote")[:255],
+                status=status,
+                source="Email",
+            )
+            db.add(app)
+            db.flush()
+            assign_company(db, app)
+            record_status_change(db, app, None, status)
+            existing[key] = app
+            changed += 1
+        # An acknowledgement email never moves an application back to APPLIED
+        elif status != app.status and status != models.AppStatus.APPLIED:
+            previous = app.status
+            app.status = status
+            record_status_change(db, app, models.AppStatus(previous), status)
+            changed += 1
+    return changed
+
+def sync_folder(db: Session, conn: imaplib.IMAP4, account: models.MailboxAccount, folder: str) -> int:
+    state = db.query(models.MailboxFolderState).filter(
+        models.MailboxFolderState.account_id == account.id,
+        models.MailboxFolderState.folder == folder,
+    ).first()
+    if not state:
+        state = models.MailboxFolderState(account_id=account.id, folder=folder, last_uid=0)
+        db.add(state)
+
+    typ, data = conn.select(f'"{folder}"', readonly=True)
+    if typ != "OK":
+        raise imaplib.IMAP4.error(f"Cannot select {folder}: {data!r}")
+    uidvalidity = int(conn.response("UIDVALIDITY")[1][0])
+    if state.uidvalidity != uidvalidity:
+        # UIDs from a previous UIDVALIDITY epoch are meaningless; rescan the folder
+        state.uidvalidity = uidvalidity
+        state.last_uid = 0
+
+    typ, data = conn.uid("SEARCH", None, f"UID {state.last_uid + 1}:*")
+    if typ != "OK":
+        raise imaplib.IMAP4.error(f"SEARCH failed: {data!r}")
+    # "n:*" always matches the newest message, even when it is below the high-water mark
+    new_uids = sorted(u for u in (int(x) for x in data[0].split()) if u > state.last_uid)
+
+    changed = 0
+    for batch in _chunks(new_uids, FETCH_BATCH_SIZE):
+        headers = _fetch(conn, batch, "(UID BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)])")
+        wanted = [uid for uid, raw in headers if is_likely_recruiting(email.message_from_bytes(raw))]
+        parsed = []
+        if wanted:
+            for uid, raw in sorted(_fetch(conn, wanted, "(UID BODY.PEEK[])")):
+                parsed.append(parse_email(message_text(raw)))
+        changed += upsert_applications(db, account.user_id, parsed)
+        state.last_uid = batch[-1]
+        # Commit per batch so an interrupted sync resumes from the last finished batch
+        db.commit()
+    return changed
+
+def sync_account(account_id: int) -> int:
+    """Sync every folder of one mailbox in its own session. Returns applications changed."""
+    db = SessionLocal()
+    try:
+        account = db.get(models.MailboxAccount, account_id)
+        if not account or not account.enabled:
+            return 0
+        changed = 0
+        try:
+            conn = connect(account)
+            try:
+                for folder in [f for f in account.folders.split(",") if f]:
+                    changed += sync_folder(db, conn, account, folder)
+            finally:
+                try:
+                    conn.logout()
+                except Exception:
+                    pass
+            account.last_error = None
+        except Exception as e:
+            db.rollback()
+            logger.warning("Mailbox %s sync failed: %s", account_id, e)
+            account.last_error = describe_error(e)
+        account.last_synced_at = datetime.utcnow()
+        db.commit()
+        return changed
+    finally:
+        db.close()
+
+def sync_all(concurrency: int = 8) -> int:
+    """Sync every enabled mailbox with at most `concurrency` IMAP connections open at once."""
+    db = SessionLocal()
+    try:
+        account_ids = [row[0] for row in db.query(models.MailboxAccount.id).filter(
+            models.MailboxAccount.enabled == 1
+        ).order_by(models.MailboxAccount.last_synced_at).all()]
+    finally:
+        db.close()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return sum(pool.map(sync_account, account_ids))
@@ -0,0 +1,352 @@
+import hashlib
+import json
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from .. import models
+from ..cache import get_cache
+
+N_FEATURES = 2 ** 20
+
+# Mirrors the skill database in frontend/src/services/cvMatchingService.js
+# (single-letter languages are left out because they match too much prose)
+SKILLS = [
+    "JavaScript", "TypeScript", "Python", "Java", "C#", "C++", "PHP", "Ruby", "Go", "Rust",
+    "Swift", "Kotlin", "Scala", "MATLAB", "SQL",
+    "React", "Angular", "Vue.js", "Node.js", "Express.js", "Next.js", "Nuxt.js", ".NET",
+    "ASP.NET", "Django", "Flask", "FastAPI", "Spring Boot", "Laravel", "Rails", "Svelte",
+    "MongoDB", "PostgreSQL", "MySQL", "SQLite", "Redis", "Cassandra", "DynamoDB", "Oracle",
+    "SQL Server", "Elasticsearch", "Neo4j",
+    "AWS", "Azure", "Google Cloud", "GCP", "Docker", "Kubernetes", "Terraform",
+    "CloudFormation", "Serverless", "Lambda", "EC2", "S3",
+    "Git", "GitHub", "GitLab", "Jenkins", "CircleCI", "JIRA", "Confluence", "Webpack",
+    "Babel", "ESLint", "Jest", "Cypress", "Selenium", "Postman", "Figma",
+    "React Native", "Flutter", "iOS", "Android", "Xamarin", "Ionic", "Objective-C",
+]
+
+TOKEN_RE = re.compile(r"\.?[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|\.?[a-z0-9]")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens plus adjacent-word bigrams (for skills like "spring boot")."""
+    words = TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+SKILL_TERMS = [" ".join(TOKEN_RE.findall(skill.lower())) for skill in SKILLS]
+_SKILL_IDS = {term: i for i, term in enumerate(SKILL_TERMS)}
+
+def _feature(term: str) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(term.encode()) % N_FEATURES
+
+SKILL_FEATURES = np.array([_feature(term) for term in SKILL_TERMS], dtype=np.int64)
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def vectorize(text: str) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """Return (feature ids, sublinear tf weights, skill ids) for a document."""
+    terms = tokenize(text)
+    counts: Dict[int, int] = {}
+    skills = set()
+    for term in terms:
+        f = _feature(term)
+        counts[f] = counts.get(f, 0) + 1
+        skill_id = _SKILL_IDS.get(term)
+        if skill_id is not None:
+            skills.add(skill_id)
+    indices = np.array(sorted(counts), dtype=np.int32)
+    values = np.array([1.0 + np.log(counts[i]) for i in indices], dtype=np.float32)
+    return indices, values, sorted(skills)
+
+def _pack(indices: np.ndarray, values: np.ndarray) -> Tuple[bytes, bytes]:
+    return indices.astype(np.int32).tobytes(), values.astype(np.float32).tobytes()
+
+def _unpack(indices: bytes, values: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    return np.frombuffer(indices, dtype=np.int32), np.frombuffer(values, dtype=np.float32)
+
+def _namespace(user_id: int) -> str:
+    return f"match_vectors:{user_id}"
+
+# Each version bump records which applications changed, so other workers can patch
+# just those rows of their cached matrix instead of rebuilding it
+CHANGES_NAMESPACE = "match_changes"
+CHANGES_TTL = 24 * 3600
+MAX_CHANGES_REPLAYED = 32
+
+def publish_changes(user_id: int, app_ids: Iterable[int]) -> int:
+    """Bump the user's matrix version and log the changed rows. Call only after commit."""
+    cache = get_cache()
+    version = cache.bump(_namespace(user_id))
+    cache.set(CHANGES_NAMESPACE, f"{user_id}:{version}", sorted(set(app_ids)), ttl=CHANGES_TTL)
+    return version
+
+def _mark_changed(db: Session, app: models.Application):
+    # Published from after_commit: bumping earlier would let a concurrent reader
+    # rebuild from the old rows and cache them under the new version
+    db.info.setdefault("match_changes", {}).setdefault(app.user_id, set()).add(app.id)
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session):
+    for user_id, app_ids in session.info.pop("match_changes", {}).items():
+        publish_changes(user_id, app_ids)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_rollback(session: Session, transaction):
+    # Still pending once the outermost transaction ends means it was rolled back
+    if transaction.parent is None:
+        session.info.pop("match_changes", None)
+
+def save_resume(db: Session, user_id: int, text: str) -> models.Resume:
+    resume = db.query(models.Resume).filter(models.Resume.user_id == user_id).first()
+    digest = content_hash(text)
+    if resume and resume.content_hash == digest:
+        return resume
+    indices, values, skills = vectorize(text)
+    packed_indices, packed_values = _pack(indices, values)
+    if not resume:
+        resume = models.Resume(user_id=user_id)
+        db.add(resume)
+    resume.content_hash = digest
+    resume.text = text
+    resume.vector_indices = packed_indices
+    resume.vector_values = packed_values
+    resume.skills = json.dumps(skills)
+    return resume
+
+def save_job_description(db: Session, app: models.Application, text: Optional[str]):
+    """Attach, replace or (with empty text) remove an application's job description."""
+    jd = db.query(models.JobDescription).filter(models.JobDescription.application_id == app.id).first()
+    text = (text or "").strip()
+    if not text:
+        if jd:
+            db.delete(jd)
+            _mark_changed(db, app)
+        return
+    digest = content_hash(text)
+    if jd and jd.content_hash == digest:
+        return
+    indices, values, skills = vectorize(text)
+    packed_indices, packed_values = _pack(indices, values)
+    if not jd:
+        jd = models.JobDescription(user_id=app.user_id, application_id=app.id)
+        db.add(jd)
+    jd.content_hash = digest
+    jd.text = text
+    jd.vector_indices = packed_indices
+    jd.vector_values = packed_values
+    jd.skills = json.dumps(skills)
+    _mark_changed(db, app)
+
+def forget_application(db: Session, app: models.Application):
+    save_job_description(db, app, None)
+
+def vectorize_cached(text: str) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """Vectorize an ad-hoc job description (e.g. from /ai/cover-letter), cached by content hash."""
+    cache = get_cache()
+    key = content_hash(text)
+    hit = cache.get("jd_vectors", key)
+    if hit:
+        return np.array(hit["i"], dtype=np.int32), np.array(hit["v"], dtype=np.float32), hit["s"]
+    indices, values, skills = vectorize(text)
+    cache.set("jd_vectors", key, {"i": indices.tolist(), "v": values.tolist(), "s": skills}, ttl=7 * 24 * 3600)
+    return indices, values, skills
+
+class _UserMatrix:
+    """Row-normalized tf-idf matrix of one user's job descriptions, plus the raw tf rows it came from."""
+
+    def __init__(self, version: int, app_ids: np.ndarray, tf: sparse.csr_matrix, skills: sparse.csr_matrix,
+                 fingerprint: Optional[tuple] = None):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.app_ids = app_ids
+        self.tf = tf
+        self.skills = skills
+        df = np.bincount(tf.indices, minlength=N_FEATURES)
+        self.idf = (np.log((1.0 + len(app_ids)) / (1.0 + df)) + 1.0).astype(np.float32)
+        weighted = tf.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.matrix = sparse.diags(1.0 / norms).dot(weighted).tocsr().astype(np.float32)
+        self.matrix.sort_indices()
+
+MAX_CACHED_MATRICES = 256
+
+_matrices: Dict[int, _UserMatrix] = {}
+_matrices_lock = threading.Lock()
+
+def _load_rows(db: Session, user_id: int, app_ids: Optional[List[int]] = None
+               ) -> Tuple[np.ndarray, sparse.csr_matrix, sparse.csr_matrix]:
+    """Stored tf vectors and skills for the user's job descriptions (or just `app_ids`)."""
+    q = db.query(
+        models.JobDescription.application_id,
+        models.JobDescription.vector_indices,
+        models.JobDescription.vector_values,
+        models.JobDescription.skills,
+    ).filter(models.JobDescription.user_id == user_id)
+    if app_ids is not None:
+        q = q.filter(models.JobDescription.application_id.in_(app_ids))
+    rows = q.all()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    unpacked = [_unpack(r[1], r[2]) for r in rows]
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(i) for i, _ in unpacked])
+    indices = np.concatenate([i for i, _ in unpacked]) if unpacked else np.zeros(0, dtype=np.int32)
+    values = np.concatenate([v for _, v in unpacked]) if unpacked else np.zeros(0, dtype=np.float32)
+    tf = sparse.csr_matrix((values, indices, indptr), shape=(len(rows), N_FEATURES))
+
+    skill_lists = [json.loads(r[3]) for r in rows]
+    skill_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    skill_indptr[1:] = np.cumsum([len(s) for s in skill_lists])
+    skill_indices = np.array([s for lst in skill_lists for s in lst], dtype=np.int32)
+    skills = sparse.csr_matrix(
+        (np.ones(len(skill_indices), dtype=np.float32), skill_indices, skill_indptr),
+        shape=(len(rows), len(SKILLS)),
+    )
+    return ids, tf, skills
+
+def _fingerprint(db: Session, user_id: int) -> tuple:
+    """
+    Cheap summary of the user's job descriptions. Any insert, delete or edit changes it,
+    which catches writes made by other workers when the cache can't broadcast bumps.
+    """
+    jd = models.JobDescription
+    row = db.query(func.count(jd.id), func.max(jd.id), func.sum(jd.id), func.max(jd.updated_at)).filter(
+        jd.user_id == user_id
+    ).one()
+    return tuple(str(v) for v in row)
+
+def _build_matrix(db: Session, user_id: int, version: int, fingerprint: Optional[tuple] = None) -> _UserMatrix:
+    return _UserMatrix(version, *_load_rows(db, user_id), fingerprint=fingerprint)
+
+def _patch_matrix(db: Session, user_id: int, cached: _UserMatrix, version: int) -> Optional[_UserMatrix]:
+    """
+    Replay the change log from cached.version to `version`, reloading only the changed
+    rows. idf and row norms are recomputed from the cached tf rows, which needs no
+    database reads. Returns None when the log is incomplete and a full rebuild is due.
+    """
+    if version - cached.version > MAX_CHANGES_REPLAYED:
+        return None
+    cache = get_cache()
+    changed = set()
+    for v in range(cached.version + 1, version + 1):
+        ids = cache.get(CHANGES_NAMESPACE, f"{user_id}:{v}")
+        if ids is None:
+            return None
+        changed.update(ids)
+    keep = ~np.isin(cached.app_ids, list(changed))
+    new_ids, new_tf, new_skills = _load_rows(db, user_id, sorted(changed))
+    return _UserMatrix(
+        version,
+        np.concatenate([cached.app_ids[keep], new_ids]),
+        sparse.vstack([cached.tf[keep], new_tf], format="csr"),
+        sparse.vstack([cached.skills[keep], new_skills], format="csr"),
+    )
+
+def _user_matrix(db: Session, user_id: int) -> _UserMatrix:
+    cache = get_cache()
+    version = cache.version(_namespace(user_id))
+    cached = _matrices.get(user_id)
+    if cache.shared:
+        if cached is not None and cached.version == version:
+            return cached
+        built = None
+        if cached is not None and cached.version < version:
+            built = _patch_matrix(db, user_id, cached, version)
+        if built is None:
+            built = _build_matrix(db, user_id, version)
+    else:
+        # A process-local cache never sees other workers' bumps, so check the rows themselves
+        fingerprint = _fingerprint(db, user_id)
+        if cached is not None and cached.fingerprint == fingerprint:
+            return cached
+        built = _build_matrix(db, user_id, version, fingerprint)
+    with _matrices_lock:
+        _matrices.pop(user_id, None)
+        while len(_matrices) >= MAX_CACHED_MATRICES:
+            _matrices.pop(next(iter(_matrices)))
+        _matrices[user_id] = built
+    return built
+
+def _query_vector(indices: np.ndarray, values: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    dense = np.zeros(N_FEATURES, dtype=np.float32)
+    dense[indices] = values * idf[indices]
+    norm = np.linalg.norm(dense)
+    return dense / norm if norm else dense
+
+def _row_weights(matrix: sparse.csr_matrix, row: int, features: np.ndarray) -> np.ndarray:
+    """Look up a few entries of one CSR row without going through scipy fancy indexing."""
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    cols, vals = matrix.indices[start:end], matrix.data[start:end]
+    if not len(cols):
+        return np.zeros(len(features), dtype=np.float32)
+    pos = np.minimum(np.searchsorted(cols, features), len(cols) - 1)
+    return np.where(cols[pos] == features, vals[pos], 0.0)
+
+def _top_skills(skill_ids: np.ndarray, contributions: np.ndarray, limit: int) -> List[str]:
+    """Order shared skills by how much each contributes to the cosine score."""
+    order = np.argsort(-contributions, kind="stable")
+    return [SKILLS[skill_ids[i]] for i in order[:limit]]
+
+def rank_applications(db: Session, user_id: int, limit: int = 20, skills_per_job: int = 5) -> List[Dict]:
+    """Score the user's resume against every attached job description in one sparse mat-vec."""
+    resume = db.query(models.Resume).filter(models.Resume.user_id == user_id).first()
+    if not resume:
+        return []
+    um = _user_matrix(db, user_id)
+    if not len(um.app_ids):
+        return []
+    query = _query_vector(*_unpack(resume.vector_indices, resume.vector_values), um.idf)
+    scores = um.matrix.dot(query)
+    if limit < len(scores):
+        top = np.argpartition(-scores, limit)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+    else:
+        top = np.argsort(-scores, kind="stable")
+
+    resume_skills = np.zeros(len(SKILLS), dtype=np.float32)
+    resume_skills[json.loads(resume.skills)] = 1.0
+    matched = um.skills[top].multiply(resume_skills).tocsr()
+    matched.eliminate_zeros()
+
+    apps = {
+        a.id: a for a in db.query(models.Application.id, models.Application.company,
+                                  models.Application.role, models.Application.status)
+        .filter(models.Application.id.in_([int(um.app_ids[i]) for i in top])).all()
+    }
+    results = []
+    for pos, row in enumerate(top):
+        app = apps.get(int(um.app_ids[row]))
+        if app is None:
+            continue
+        skill_ids = matched[pos].indices
+        features = SKILL_FEATURES[skill_ids]
+        contributions = _row_weights(um.matrix, row, features) * query[features]
+        results.append({
+            "application_id": app.id,
+            "company": app.company,
+            "role": app.role,
+            "status": app.status,
+            "score": round(float(scores[row]), 4),
+            "matched_skills": _top_skills(skill_ids, contributions, skills_per_job),
+        })
+    return results
+
+def score_text(db: Session, user_id: int, text: str, skills_limit: int = 10) -> Optional[Dict]:
+    """Score an ad-hoc job description against the user's resume using the user's idf weights."""
+    resume = db.query(models.Resume).filter(models.Resume.user_id == user_id).first()
+    if not resume:
+        return None
+    um = _user_matrix(db, user_id)
+    job_indices, job_values, job_skills = vectorize_cached(text)
+    job = _query_vector(job_indices, job_values, um.idf)
+    query = _query_vector(*_unpack(resume.vector_indices, resume.vector_values), um.idf)
+    common = np.array(sorted(set(job_skills) & set(json.loads(resume.skills))), dtype=np.int64)
+    return {
+        "score": round(float(job.dot(query)), 4),
+        "matched_skills": _top_skills(common, job[SKILL_FEATURES[common]] * query[SKILL_FEATURES[common]], skills_limit),
+    }
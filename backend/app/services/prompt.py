@@ -0,0 +1,167 @@
+import hashlib
+import re
+from typing import Dict, List, Tuple
+from ..cache import get_cache
+from .matching import SKILL_TERMS, tokenize
+
+# Headings that open a section which never helps write a cover letter
+BOILERPLATE_HEADINGS = re.compile(
+    r"^\W*(equal (employment )?opportunit|eeo\b|benefits|perks|what we offer|why (join|work)|"
+    r"compensation|pay (range|transparency)|salary range|about (us|the company)|who we are|"
+    r"our (mission|values|culture)|privacy|disclaimer|accommodations?|e-verify|how to apply|"
+    r"diversity|life at)",
+    re.IGNORECASE,
+)
+# Paragraphs dropped wherever they appear
+BOILERPLATE_PHRASES = re.compile(
+    r"equal opportunity employer|without regard to (race|religion|sex|gender)|protected veteran|"
+    r"reasonable accommodation|e-verify|applicants? with (arrest|conviction)|by applying,? you (agree|consent)|"
+    r"privacy (policy|notice)|401\(?k\)?|dental|paid time off|pto\b|parental leave|"
+    r"recruitment agencies|unsolicited (resumes|applications)",
+    re.IGNORECASE,
+)
+REQUIREMENT_HINTS = re.compile(
+    r"require|must|experience (with|in)|\d\+? years|proficien|knowledge of|familiar|skills?\b|"
+    r"degree|qualif|responsib|you will|you'll|ability to|expertise|hands-on|strong",
+    re.IGNORECASE,
+)
+HEADING_RE = re.compile(r"^\s*(#+\s*)?[A-Za-z][A-Za-z &/',-]{1,60}:?\s*$")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+# Part of the cache key; raise it when compaction output changes so shared caches drop old results
+COMPACTION_VERSION = 2
+# Keeping less than this share of the requirement text means stripping misfired
+MIN_KEPT_FRACTION = 0.5
+_SKILL_SET = set(SKILL_TERMS)
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Local token count: tiktoken when installed, otherwise a word-piece estimate."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly one token per short word or punctuation mark, long words split every ~4 chars
+    return sum(max(1, (len(piece) + 3) // 4) for piece in re.findall(r"\w+|[^\w\s]", text))
+
+def _paragraphs(text: str) -> List[str]:
+    blocks = re.split(r"\n\s*\n", text.replace("\r\n", "\n"))
+    return [b.strip() for b in blocks if b.strip()]
+
+def strip_boilerplate(text: str) -> str:
+    """Drop boilerplate sections and paragraphs, and paragraphs repeated verbatim."""
+    kept: List[str] = []
+    seen = set()
+    skipping = False
+    for para in _paragraphs(text):
+        lines = para.split("\n")
+        first = lines[0].strip()
+        if HEADING_RE.match(first):
+            # A heading decides whether the section under it is kept
+            skipping = bool(BOILERPLATE_HEADINGS.match(first))
+            if len(lines) == 1:
+                if not skipping:
+                    kept.append(para)
+                continue
+        if BOILERPLATE_PHRASES.search(para):
+            continue
+        if skipping:
+            # Postings often open with "About Us" and go straight into the role without a heading
+            if not _is_requirement(para):
+                continue
+            skipping = False
+        key = re.sub(r"\W+", " ", para.lower()).strip()
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(para)
+    return "\n\n".join(kept)
+
+def _units(text: str) -> List[str]:
+    """Bullets stay whole; prose is split into sentences. Repeated units are dropped."""
+    units = []
+    seen = set()
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if re.match(r"^([-*•▪]|\d+[.)])\s+", line):
+            candidates = [line]
+        else:
+            candidates = [s.strip() for s in SENTENCE_SPLIT.split(line) if s.strip()]
+        for unit in candidates:
+            # Postings repeat requirements under different headings or bullet styles
+            key = re.sub(r"\W+", " ", unit.lower()).strip()
+            if key in seen:
+                continue
+            seen.add(key)
+            units.append(unit)
+    return units
+
+def _is_requirement(unit: str) -> bool:
+    if REQUIREMENT_HINTS.search(unit):
+        return True
+    return any(term in _SKILL_SET for term in tokenize(unit))
+
+def _requirement_tokens(text: str) -> int:
+    # Over distinct units, so removing duplicates never looks like losing requirements
+    return sum(count_tokens(u) for u in _units(text) if _is_requirement(u))
+
+def fit_to_budget(text: str, budget: int) -> str:
+    """Keep requirement and skill sentences first, then other sentences, in original order."""
+    units = _units(text)
+    costs = [count_tokens(u) for u in units]
+    if sum(costs) <= budget:
+        return "\n".join(units)
+    chosen = set()
+    used = 0
+    for wanted in (True, False):
+        for i, unit in enumerate(units):
+            if i in chosen or _is_requirement(unit) != wanted:
+                continue
+            if used + costs[i] <= budget:
+                chosen.add(i)
+                used += costs[i]
+    if not chosen:
+        # Nothing fits whole; fall back to a hard cut of roughly `budget` tokens
+        return text[:budget * 4]
+    return "\n".join(units[i] for i in sorted(chosen))
+
+def compact_job_description(text: str, budget: int) -> str:
+    """Boilerplate-stripped, deduplicated and budgeted job description, cached by content hash."""
+    key = hashlib.sha256(f"{COMPACTION_VERSION}:{budget}:{text}".encode()).hexdigest()
+    cache = get_cache()
+    hit = cache.get("jd_compact", key)
+    if hit is not None:
+        return hit
+    stripped = strip_boilerplate(text)
+    if not stripped or _requirement_tokens(stripped) < _requirement_tokens(text) * MIN_KEPT_FRACTION:
+        stripped = text
+    compacted = fit_to_budget(stripped, budget)
+    cache.set("jd_compact", key, compacted, ttl=7 * 24 * 3600)
+    return compacted
+
+def compact_resume(text: str, budget: int) -> str:
+    paragraphs = list(dict.fromkeys(_paragraphs(text)))
+    return fit_to_budget("\n\n".join(paragraphs), budget)
+
+def token_report(original: str, compacted: str) -> Dict[str, int]:
+    before, after = count_tokens(original), count_tokens(compacted)
+    return {"original": before, "compacted": after, "saved": max(0, before - after)}
+
+def split_budget(total: int, fixed: int, resume_tokens: int) -> Tuple[int, int]:
+    """Give the resume at most a third of what the template leaves; the job description gets the rest."""
+    available = max(0, total - fixed)
+    resume_budget = min(resume_tokens, available // 3)
+    return resume_budget, available - resume_budget
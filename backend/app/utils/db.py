@@ -0,0 +1,20 @@
+from typing import Any, Dict, Optional, Type
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+def get_or_create(db: Session, model: Type, defaults: Optional[Dict[str, Any]] = None, **keys):
+    """
+    Fetch the row matching `keys` (a unique key) or insert it with `defaults`.
+    The insert runs in a savepoint, so losing a race with another writer only
+    rolls back that insert, not the caller's transaction.
+    """
+    obj = db.query(model).filter_by(**keys).first()
+    if obj is not None:
+        return obj
+    try:
+        with db.begin_nested():
+            obj = model(**keys, **(defaults or {}))
+            db.add(obj)
+        return obj
+    except IntegrityError:
+        return db.query(model).filter_by(**keys).one()
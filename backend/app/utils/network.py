@@ -0,0 +1,29 @@
+import ipaddress
+import socket
+
+class BlockedAddressError(ValueError):
+    """A user-supplied host is unresolvable or points at a non-public address."""
+
+def resolve_public_address(host: str, port: int) -> str:
+    """
+    Resolve a user-supplied host and return one of its addresses. Every record must
+    be global unicast; private, loopback, link-local (169.254.169.254) and similar
+    ranges are refused so users can't make the server reach internal services.
+    Connect to the returned address rather than the name, so DNS can't change in between.
+    """
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError) as e:
+        raise BlockedAddressError(f"host {host} cannot be resolved") from e
+    addresses = []
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        # Every record must be public, or a resolver could steer the connection inward
+        if not address.is_global or address.is_multicast:
+            raise BlockedAddressError(f"host {host} resolves to a non-public address")
+        addresses.append(str(address))
+    if not addresses:
+        raise BlockedAddressError(f"host {host} cannot be resolved")
+    return addresses[0]
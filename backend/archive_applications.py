@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Archival job
+Moves old closed applications out of the hot applications table
+"""
+
+import argparse
+import time
+
+from app.database import Base, engine, SessionLocal
+from app.services.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archive_closed_applications, ensure_autoincrement
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive closed applications")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_autoincrement(engine)
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            moved = archive_closed_applications(db, args.older_than_days, args.batch_size, max_batches=1)
+            if not moved:
+                break
+            total += moved
+            # Let foreground writers in between batches
+            time.sleep(args.pause)
+    finally:
+        db.close()
+    print(f"Archived {total} applications")
+
+if __name__ == "__main__":
+    main()
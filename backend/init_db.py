@@ -6,6 +6,8 @@ Creates tables and adds sample data if needed
 
 from app.database import Base, engine, SessionLocal
 from app.models import User, Application, AppStatus
+from app.services.companies import assign_company
+from app.services.funnel import backfill_events, record_status_change
 from passlib.context import CryptContext
 import datetime
 
@@ -25,6 +27,9 @@ def init_database():
         # Check if we already have a user
         existing_user = db.query(User).first()
         if existing_user:
+            seeded = backfill_events(db)
+            if seeded:
+                print(f"Backfilled status history for {seeded} applications")
             print("Database already has data, skipping sample data creation.")
             return
             
@@ -81,6 +86,9 @@ def init_database():
         
         for app in sample_applications:
             db.add(app)
+            db.flush()
+            assign_company(db, app)
+            record_status_change(db, app, None, app.status)
         
         db.commit()
         print(f"Created {len(sample_applications)} sample applications")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Companies migration
+Adds applications.company_id and backfills companies and their counters in batches
+"""
+
+import argparse
+import time
+
+from app.database import Base, engine, SessionLocal
+from app.services.companies import backfill_companies, ensure_company_columns
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the companies table")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_company_columns(engine)
+
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            done = backfill_companies(db, args.batch_size, max_batches=1)
+            if not done:
+                break
+            total += done
+            time.sleep(args.pause)
+    finally:
+        db.close()
+    print(f"Linked {total} applications to companies")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Background job worker
+Runs queued email ingestion and cover letter jobs from the jobs table
+"""
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+
+from app.database import Base, engine
+from app.services.jobs import run_next
+
+def work(worker_id: str, poll_interval: float, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            if not run_next(worker_id):
+                stop.wait(poll_interval)
+        except Exception:
+            logging.exception("Worker %s crashed on a job; continuing", worker_id)
+            stop.wait(poll_interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs run at once by this process")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+
+    stop = threading.Event()
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=work, args=(f"{prefix}:{i}", args.poll_interval, stop), daemon=True)
+        for i in range(args.concurrency)
+    ]
+    for t in threads:
+        t.start()
+    print(f"Job worker {prefix} running with concurrency {args.concurrency}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop.set()
+        for t in threads:
+            t.join()
+
+if __name__ == "__main__":
+    main()
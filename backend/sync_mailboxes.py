@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+IMAP ingestion worker
+Fetches new messages from every registered mailbox and upserts applications
+"""
+
+import argparse
+import logging
+import time
+
+from app.database import Base, engine
+from app.services.mail_sync import sync_all
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync registered IMAP mailboxes into applications")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum mailboxes synced at once")
+    parser.add_argument("--interval", type=int, default=0, help="Seconds between passes; 0 runs a single pass")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+
+    while True:
+        started = time.monotonic()
+        changed = sync_all(concurrency=args.concurrency)
+        print(f"Synced mailboxes in {time.monotonic() - started:.1f}s, {changed} applications changed")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the app package the same way the scripts in backend/ do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
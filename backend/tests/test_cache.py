@@ -0,0 +1,143 @@
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app.cache import MemoryCache, RedisCache, SQLiteCache
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server for RedisCache: AUTH, SELECT, GET, SET [PX], DEL, INCR."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+        self.commands = []
+        self.drop_next = False
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode())
+        return args
+
+    def reply(self, value):
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(value, int):
+            self.wfile.write(b":%d\r\n" % value)
+        elif value == "OK":
+            self.wfile.write(b"+OK\r\n")
+        else:
+            data = value.encode()
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(data), data))
+
+    def handle(self):
+        server = self.server
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            server.commands.append(args[0])
+            if server.drop_next:
+                server.drop_next = False
+                return
+            name, now = args[0].upper(), time.monotonic()
+            with server.lock:
+                if name in ("AUTH", "SELECT"):
+                    self.reply("OK")
+                elif name == "GET":
+                    value, expires_at = server.data.get(args[1], (None, None))
+                    self.reply(None if expires_at is not None and expires_at <= now else value)
+                elif name == "SET":
+                    expires_at = now + int(args[4]) / 1000 if len(args) > 3 else None
+                    server.data[args[1]] = (args[2], expires_at)
+                    self.reply("OK")
+                elif name == "DEL":
+                    self.reply(1 if server.data.pop(args[1], None) else 0)
+                elif name == "INCR":
+                    value = int(server.data.get(args[1], ("0", None))[0]) + 1
+                    server.data[args[1]] = (str(value), None)
+                    self.reply(value)
+                else:
+                    self.wfile.write(b"-ERR unknown command\r\n")
+
+@pytest.fixture
+def resp_server():
+    server = RespStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCache()
+    if request.param == "sqlite":
+        return SQLiteCache(str(tmp_path / "cache.db"))
+    server = request.getfixturevalue("resp_server")
+    return RedisCache(port=server.server_address[1])
+
+def test_round_trip(cache):
+    assert cache.get("ns", "missing") is None
+    cache.set("ns", "key", {"a": [1, 2]})
+    assert cache.get("ns", "key") == {"a": [1, 2]}
+    cache.delete("ns", "key")
+    assert cache.get("ns", "key", default="gone") == "gone"
+
+def test_bump_invalidates_namespace_only(cache):
+    cache.set("ns", "key", 1)
+    cache.set("other", "key", 2)
+    assert cache.bump("ns") == 1
+    assert cache.version("ns") == 1
+    assert cache.get("ns", "key") is None
+    assert cache.get("other", "key") == 2
+
+def test_ttl_expiry(cache):
+    cache.set("ns", "short", "v", ttl=0.05)
+    cache.set("ns", "long", "v", ttl=60)
+    time.sleep(0.1)
+    assert cache.get("ns", "short") is None
+    assert cache.get("ns", "long") == "v"
+
+def test_concurrent_bumps_get_distinct_versions(cache):
+    versions = []
+    lock = threading.Lock()
+
+    def bump_many():
+        for _ in range(50):
+            v = cache.bump("ns")
+            with lock:
+                versions.append(v)
+
+    threads = [threading.Thread(target=bump_many) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(versions) == list(range(1, 201))
+
+def test_redis_auth_and_select(resp_server):
+    cache = RedisCache(port=resp_server.server_address[1], db=2, password="secret")
+    cache.set("ns", "key", "v")
+    assert resp_server.commands[:2] == ["AUTH", "SELECT"]
+    assert "SET" in resp_server.commands
+    assert all(k.startswith("jobtracker:") for k in resp_server.data)
+
+def test_redis_reconnects_after_dropped_connection(resp_server):
+    cache = RedisCache(port=resp_server.server_address[1])
+    cache.set("ns", "key", "v")
+    resp_server.drop_next = True
+    with pytest.raises(ConnectionError):
+        cache.get("ns", "key")
+    assert cache.get("ns", "key") == "v"
@@ -0,0 +1,162 @@
+import re
+import socketserver
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.services import mail_sync
+from app.utils.network import BlockedAddressError
+from app.utils.security import encrypt_secret
+
+RECRUITING = (
+    b"From: jobs@acme.example\r\nSubject: Your application to Acme Corp\r\n\r\n"
+    b"Thank you for applying for the Software Engineer position at Acme Corp. "
+    b"We would like to schedule an interview.\r\n"
+)
+NEWSLETTER = (
+    b"From: news@shop.example\r\nSubject: Weekly deals\r\n\r\n"
+    b"This week's best deals.\r\n"
+)
+
+class ImapStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of an IMAP server for sync_folder: LOGIN, SELECT/EXAMINE, UID SEARCH and UID FETCH."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ImapHandler)
+        self.messages = {}  # uid -> raw message
+        self.uidvalidity = 1
+        self.body_fetches = []  # uids whose full body was requested
+
+class ImapHandler(socketserver.StreamRequestHandler):
+    def write(self, data):
+        self.wfile.write(data if isinstance(data, bytes) else data.encode())
+
+    def handle(self):
+        server = self.server
+        self.write("* OK stand-in ready\r\n")
+        while True:
+            line = self.rfile.readline().decode()
+            if not line:
+                return
+            tag, command, *rest = line.strip().split(" ", 2)
+            rest = rest[0] if rest else ""
+            command = command.upper()
+            if command == "CAPABILITY":
+                self.write(f"* CAPABILITY IMAP4rev1\r\n{tag} OK done\r\n")
+            elif command == "LOGIN":
+                self.write(f"{tag} OK done\r\n")
+            elif command in ("SELECT", "EXAMINE"):
+                self.write(f"* {len(server.messages)} EXISTS\r\n"
+                           f"* OK [UIDVALIDITY {server.uidvalidity}] ok\r\n{tag} OK [READ-ONLY] done\r\n")
+            elif command == "LOGOUT":
+                self.write(f"* BYE\r\n{tag} OK done\r\n")
+                return
+            elif command == "UID" and rest.upper().startswith("SEARCH"):
+                low = int(re.search(r"UID (\d+):", rest).group(1))
+                # Like a real server, "n:*" always includes the newest message
+                uids = [u for u in sorted(server.messages) if u >= low] or sorted(server.messages)[-1:]
+                self.write(f"* SEARCH {' '.join(map(str, uids))}\r\n{tag} OK done\r\n")
+            elif command == "UID" and rest.upper().startswith("FETCH"):
+                _, uids, query = rest.split(" ", 2)
+                for seq, uid in enumerate(map(int, uids.split(",")), 1):
+                    raw = server.messages[uid]
+                    if "HEADER.FIELDS" in query:
+                        data, name = raw.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n", "BODY[HEADER.FIELDS (FROM SUBJECT)]"
+                    else:
+                        data, name = raw, "BODY[]"
+                        server.body_fetches.append(uid)
+                    self.write(f"* {seq} FETCH (UID {uid} {name} {{{len(data)}}}\r\n".encode() + data + b")\r\n")
+                self.write(f"{tag} OK done\r\n")
+            else:
+                self.write(f"{tag} BAD unsupported\r\n")
+
+@pytest.fixture
+def imap_server():
+    server = ImapStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def account(db, imap_server, monkeypatch):
+    monkeypatch.setattr(mail_sync, "IMAP_ALLOWED_HOSTS", {"127.0.0.1"})
+    user = models.User(email="a@example.com", first_name="A", last_name="B", hashed_password="x")
+    db.add(user)
+    db.flush()
+    account = models.MailboxAccount(
+        user_id=user.id, host="127.0.0.1", port=imap_server.server_address[1], use_ssl=0,
+        username="a@example.com", encrypted_password=encrypt_secret("pw"),
+    )
+    db.add(account)
+    db.commit()
+    return account
+
+def _sync(db, account):
+    conn = mail_sync.connect(account)
+    try:
+        return mail_sync.sync_folder(db, conn, account, "INBOX")
+    finally:
+        conn.logout()
+
+def _state(db, account):
+    return db.query(models.MailboxFolderState).filter_by(account_id=account.id, folder="INBOX").one()
+
+def test_only_recruiting_messages_are_downloaded(db, account, imap_server):
+    imap_server.messages = {1: NEWSLETTER, 2: RECRUITING, 3: NEWSLETTER}
+    assert _sync(db, account) == 1
+    assert imap_server.body_fetches == [2]
+    app = db.query(models.Application).one()
+    assert (app.company, app.role) == ("Acme", "Software Engineer")
+
+def test_high_water_mark_skips_seen_messages(db, account, imap_server):
+    imap_server.messages = {1: NEWSLETTER, 2: RECRUITING}
+    _sync(db, account)
+    assert _state(db, account).last_uid == 2
+
+    imap_server.body_fetches.clear()
+    assert _sync(db, account) == 0
+    assert imap_server.body_fetches == []
+
+    imap_server.messages[5] = RECRUITING
+    _sync(db, account)
+    assert imap_server.body_fetches == [5]
+    assert _state(db, account).last_uid == 5
+
+def test_uidvalidity_change_rescans_folder(db, account, imap_server):
+    imap_server.messages = {1: RECRUITING, 2: NEWSLETTER}
+    _sync(db, account)
+    assert _state(db, account).uidvalidity == 1
+
+    imap_server.uidvalidity = 2
+    imap_server.messages = {1: RECRUITING}
+    imap_server.body_fetches.clear()
+    _sync(db, account)
+    state = _state(db, account)
+    assert (state.uidvalidity, state.last_uid) == (2, 1)
+    assert imap_server.body_fetches == [1]
+    # The same email seen again in the new epoch doesn't duplicate the application
+    assert db.query(models.Application).count() == 1
+
+def test_private_hosts_are_refused_unless_allowlisted(monkeypatch):
+    monkeypatch.setattr(mail_sync, "IMAP_ALLOWED_HOSTS", set())
+    with pytest.raises(BlockedAddressError):
+        mail_sync.mailbox_address("127.0.0.1", 143)
+    monkeypatch.setattr(mail_sync, "IMAP_ALLOWED_HOSTS", {"127.0.0.1"})
+    assert mail_sync.mailbox_address("127.0.0.1", 143) is None